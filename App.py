@@ -1,23 +1,33 @@
 import streamlit as st
-import sqlite3
 import pandas as pd
+import hashlib
+import os
 import tempfile
 import subprocess
 
 from db_queries import (
-    get_nav_on_date,
-    get_portfolio_breakdown,
+    get_available_dates,
+    get_tickers,
+    get_portfolio_snapshot,
     get_nav_between_dates,
     get_nav_timeseries,
     get_nav_daily_table,
     get_holding_on_date,
-    get_cash_on_date,
     get_cash_timeseries,
+    get_risk_metrics,
+    get_exposure,
+    EXPOSURE_ALL,
+    get_implied_trades,
+    get_turnover_stats,
     explain_cash_change,
+    QueryTimeoutError,
+    budget_for,
+    set_entry_point,
+    time_budget,
 )
-
-DB_PATH = "portfolio.db"
-
+from export_results import export
+from fx_rates import BASE_CURRENCY
+from scenario_engine import SCENARIO_COLUMNS, load_scenarios, run_scenarios_on_date
 
 # -----------------------------
 # Page setup
@@ -35,6 +45,21 @@ st.caption(
 
 st.divider()
 
+# -----------------------------
+# Query time budget
+# -----------------------------
+set_entry_point("dashboard")
+
+
+def run_query(fn, *args):
+    """Runs a query, stopping the page with an error if it times out."""
+    try:
+        return fn(*args)
+    except QueryTimeoutError as e:
+        st.error(f"{e} Try a shorter date range or a narrower filter.")
+        st.stop()
+
+
 # -----------------------------
 # Sidebar: Excel upload
 # -----------------------------
@@ -49,44 +74,39 @@ if not uploaded_file:
     st.sidebar.info("Upload an Excel file to begin.")
     st.stop()
 
-with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx") as tmp:
-    tmp.write(uploaded_file.read())
-    temp_excel_path = tmp.name
+# Streamlit reruns the script on every interaction; only load an upload
+# once per session rather than rewriting the database on each click.
+upload_bytes = uploaded_file.getvalue()
+upload_digest = hashlib.sha1(upload_bytes).hexdigest()
+
+if st.session_state.get("loaded_upload") != upload_digest:
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx") as tmp:
+        tmp.write(upload_bytes)
+        temp_excel_path = tmp.name
+
+    try:
+        subprocess.run(
+            ["python", "load_excel_to_sqlite.py", temp_excel_path],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except subprocess.CalledProcessError as e:
+        st.sidebar.error("Data validation failed.")
+        st.sidebar.text(e.stderr)
+        st.stop()
+    finally:
+        os.remove(temp_excel_path)
 
-try:
-    subprocess.run(
-        ["python", "load_excel_to_sqlite.py", temp_excel_path],
-        capture_output=True,
-        text=True,
-        check=True,
-    )
-    st.sidebar.success("Portfolio data loaded successfully.")
-except subprocess.CalledProcessError as e:
-    st.sidebar.error("Data validation failed.")
-    st.sidebar.text(e.stderr)
-    st.stop()
+    st.session_state["loaded_upload"] = upload_digest
+
+st.sidebar.success("Portfolio data loaded successfully.")
 
 # -----------------------------
-# Helper functions
+# Reference data
 # -----------------------------
-def get_available_dates():
-    conn = sqlite3.connect(DB_PATH)
-    df = pd.read_sql(
-        "SELECT DISTINCT holding_date FROM holdings ORDER BY holding_date", conn
-    )
-    conn.close()
-    return df["holding_date"].tolist()
-
-
-def get_tickers():
-    conn = sqlite3.connect(DB_PATH)
-    df = pd.read_sql("SELECT ticker FROM securities ORDER BY ticker", conn)
-    conn.close()
-    return df["ticker"].tolist()
-
-
-dates = get_available_dates()
-tickers = get_tickers()
+dates = run_query(get_available_dates)
+tickers = run_query(get_tickers)
 
 if not dates:
     st.error("No valid portfolio data available.")
@@ -102,8 +122,13 @@ section = st.sidebar.radio(
     [
         "Portfolio Overview",
         "NAV Analysis",
+        "Risk & Performance",
+        "Exposure",
+        "Scenario Analysis",
         "Holdings",
+        "Trades",
         "Cash Analysis",
+        "Data Export",
     ],
 )
 
@@ -112,23 +137,34 @@ section = st.sidebar.radio(
 # -----------------------------
 if section == "Portfolio Overview":
     st.subheader("Portfolio Overview")
+    st.caption(f"Prices, market values, cash and NAV are shown in {BASE_CURRENCY}.")
 
     date = st.selectbox("Select date", dates, index=len(dates) - 1)
 
-    col1, col2 = st.columns(2)
+    snapshot = run_query(get_portfolio_snapshot, date)
+
+    col1, col2, col3 = st.columns(3)
 
     with col1:
-        nav = get_nav_on_date(date)
-        st.metric("Portfolio NAV", f"{nav:,.2f}")
+        nav_change = snapshot["nav_change"]
+        st.metric(
+            "Portfolio NAV",
+            f"{snapshot['nav']:,.2f}",
+            delta=None if nav_change is None else f"{nav_change:,.2f} vs {snapshot['prev_date']}",
+        )
 
     with col2:
-        cash = get_cash_on_date(date)
-        st.metric("Cash Balance", f"{cash:,.2f}")
+        st.metric("Cash Balance", f"{snapshot['cash']:,.2f}")
+
+    with col3:
+        st.metric(
+            f"Top {snapshot['top_n']} Concentration",
+            f"{snapshot['top_n_weight']:.2%}",
+        )
 
     st.markdown("### Portfolio Breakdown")
 
-    breakdown = get_portfolio_breakdown(date)
-    breakdown["Contribution (%)"] = breakdown["market_value"] / breakdown["market_value"].sum()
+    breakdown = snapshot["breakdown"].rename(columns={"weight": "Contribution (%)"})
 
     st.dataframe(
         breakdown.style.format(
@@ -156,17 +192,17 @@ elif section == "NAV Analysis":
         end_date = st.selectbox("End date", dates, index=len(dates) - 1)
 
     if st.button("Analyse NAV"):
-        nav_start, nav_end, change = get_nav_between_dates(start_date, end_date)
+        nav_start, nav_end, change = run_query(get_nav_between_dates, start_date, end_date)
         st.metric("NAV Change", f"{change:,.2f}")
 
-        nav_ts = get_nav_timeseries(start_date, end_date)
+        nav_ts = run_query(get_nav_timeseries, start_date, end_date)
         nav_ts["date"] = pd.to_datetime(nav_ts["date"])
 
         st.markdown("### NAV Over Time")
         st.line_chart(nav_ts.set_index("date")["nav"], use_container_width=True)
 
         st.markdown("### Daily NAV Detail")
-        nav_table = get_nav_daily_table(start_date, end_date)
+        nav_table = run_query(get_nav_daily_table, start_date, end_date)
 
         st.dataframe(
             nav_table.style.format(
@@ -178,6 +214,191 @@ elif section == "NAV Analysis":
             use_container_width=True,
         )
 
+# -----------------------------
+# Risk & Performance
+# -----------------------------
+elif section == "Risk & Performance":
+    st.subheader("Risk & Performance")
+    st.caption(
+        "Precomputed at load time. Returns are time weighted and adjusted "
+        "for cash flows; volatility and rolling returns use a 20 day window."
+    )
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        start_date = st.selectbox("Start date", dates, index=0)
+
+    with col2:
+        end_date = st.selectbox("End date", dates, index=len(dates) - 1)
+
+    metrics = run_query(get_risk_metrics, start_date, end_date)
+
+    if metrics.empty:
+        st.warning("No risk metrics available for the selected range.")
+        st.stop()
+
+    metrics["date"] = pd.to_datetime(metrics["date"])
+    first, last = metrics.iloc[0], metrics.iloc[-1]
+
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        period_twr = (1 + last["cumulative_twr"]) / (1 + first["cumulative_twr"]) - 1
+        st.metric("Time Weighted Return", f"{period_twr:.2%}")
+
+    with col2:
+        st.metric("Max Drawdown (since inception)", f"{last['max_drawdown']:.2%}")
+
+    with col3:
+        volatility = last["rolling_volatility"]
+        st.metric(
+            "Rolling Volatility (ann.)",
+            "n/a" if pd.isna(volatility) else f"{volatility:.2%}",
+        )
+
+    metrics = metrics.set_index("date")
+
+    st.markdown("### Cumulative Time Weighted Return")
+    st.line_chart(metrics["cumulative_twr"], use_container_width=True)
+
+    st.markdown("### Drawdown")
+    st.area_chart(metrics["drawdown"], use_container_width=True)
+
+    st.markdown("### Rolling Volatility and Return")
+    st.line_chart(
+        metrics[["rolling_volatility", "rolling_return"]], use_container_width=True
+    )
+
+    st.markdown("### Daily Detail")
+    st.dataframe(
+        metrics.reset_index().style.format(
+            {
+                "nav": "{:,.2f}",
+                "cash_flow": "{:,.2f}",
+                "daily_return": "{:.2%}",
+                "cumulative_twr": "{:.2%}",
+                "rolling_return": "{:.2%}",
+                "rolling_volatility": "{:.2%}",
+                "drawdown": "{:.2%}",
+                "max_drawdown": "{:.2%}",
+            },
+            na_rep="",
+        ),
+        use_container_width=True,
+    )
+
+# -----------------------------
+# Exposure
+# -----------------------------
+elif section == "Exposure":
+    st.subheader("Exposure Analysis")
+    st.caption("Share of NAV by asset class or currency. Cash is shown as its own asset class.")
+
+    dimension = st.radio("Group by", ["Asset class", "Currency"], horizontal=True)
+    column = "asset_class" if dimension == "Asset class" else "currency"
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        start_date = st.selectbox("Start date", dates, index=0)
+
+    with col2:
+        end_date = st.selectbox("End date", dates, index=len(dates) - 1)
+
+    if column == "asset_class":
+        exposure = run_query(get_exposure, start_date, end_date, None, EXPOSURE_ALL)
+    else:
+        exposure = run_query(get_exposure, start_date, end_date, EXPOSURE_ALL)
+
+    if exposure.empty:
+        st.warning("No exposure data available for the selected range.")
+        st.stop()
+
+    exposure["date"] = pd.to_datetime(exposure["date"])
+
+    st.markdown(f"### Weight by {dimension} Over Time")
+    st.area_chart(
+        exposure.pivot(index="date", columns=column, values="weight"),
+        use_container_width=True,
+    )
+
+    st.markdown(f"### Exposure on {end_date}")
+    latest = exposure[exposure["date"] == exposure["date"].max()]
+
+    st.dataframe(
+        latest[[column, "market_value", "weight"]].style.format(
+            {
+                "market_value": "{:,.2f}",
+                "weight": "{:.2%}",
+            }
+        ),
+        use_container_width=True,
+    )
+
+# -----------------------------
+# Scenario Analysis
+# -----------------------------
+elif section == "Scenario Analysis":
+    st.subheader("Scenario Analysis")
+    st.caption(
+        "What-if price shocks by security (ticker), asset class or currency. "
+        "Shocks are relative price moves (-0.10 is a 10% fall) and add up "
+        "across levels within a scenario."
+    )
+
+    date = st.selectbox("Select date", dates, index=len(dates) - 1)
+
+    scenario_file = st.file_uploader(
+        "Upload scenario CSV (scenario, level, key, shock)",
+        type=["csv"],
+    )
+
+    if scenario_file:
+        try:
+            scenarios = load_scenarios(scenario_file)
+        except ValueError as e:
+            st.error(str(e))
+            st.stop()
+        st.info(f"Loaded {scenarios['scenario'].nunique():,} scenarios from file.")
+    else:
+        scenarios = st.data_editor(
+            pd.DataFrame(
+                [
+                    ["Equity sell-off", "asset_class", "Equity", -0.10],
+                    ["Equity sell-off", "asset_class", "ETF", -0.08],
+                    ["EUR weakens", "currency", "EUR", -0.05],
+                ],
+                columns=SCENARIO_COLUMNS,
+            ),
+            num_rows="dynamic",
+            use_container_width=True,
+        )
+
+    if st.button("Run Scenarios"):
+        try:
+            results = run_query(run_scenarios_on_date, date, scenarios)
+        except ValueError as e:
+            st.error(str(e))
+            st.stop()
+
+        st.markdown("### NAV Impact")
+        st.bar_chart(
+            results.head(50).set_index("scenario")["nav_impact"],
+            use_container_width=True,
+        )
+
+        st.dataframe(
+            results.style.format(
+                {
+                    "nav_impact": "{:,.2f}",
+                    "nav_after": "{:,.2f}",
+                    "nav_return": "{:.2%}",
+                }
+            ),
+            use_container_width=True,
+        )
+
 # -----------------------------
 # Holdings
 # -----------------------------
@@ -193,16 +414,81 @@ elif section == "Holdings":
         date = st.selectbox("Select date", dates)
 
     if st.button("Show Holding"):
-        quantity = get_holding_on_date(ticker, date)
+        quantity = run_query(get_holding_on_date, ticker, date)
         st.metric(f"Holding in {ticker}", f"{quantity:,} shares")
 
+# -----------------------------
+# Trades
+# -----------------------------
+elif section == "Trades":
+    st.subheader("Implied Trades")
+    st.caption(
+        "Trades implied by day-over-day changes in holdings, valued at the "
+        "day's close price. Opening positions on the first date are not trades."
+    )
+
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        start_date = st.selectbox("Start date", dates, index=0)
+
+    with col2:
+        end_date = st.selectbox("End date", dates, index=len(dates) - 1)
+
+    with col3:
+        ticker_filter = st.selectbox("Security", ["All securities"] + tickers)
+
+    ticker = None if ticker_filter == "All securities" else ticker_filter
+    trades = run_query(get_implied_trades, start_date, end_date, ticker)
+
+    # Raised when the range holds no NAV, e.g. a start date after the end date
+    try:
+        stats = run_query(get_turnover_stats, start_date, end_date)
+    except ValueError:
+        st.warning("No NAV data available for the selected range.")
+        st.stop()
+
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        st.metric("Trades", f"{stats['trade_count']:,}")
+
+    with col2:
+        st.metric("Bought", f"{stats['bought']:,.2f}")
+
+    with col3:
+        st.metric("Sold", f"{stats['sold']:,.2f}")
+
+    with col4:
+        st.metric("Turnover", f"{stats['turnover']:.2%}")
+
+    if trades.empty:
+        st.info("No implied trades in the selected range.")
+        st.stop()
+
+    st.markdown("### Net Traded Notional by Day")
+    daily_notional = trades.groupby("date")["notional"].sum()
+    daily_notional.index = pd.to_datetime(daily_notional.index)
+    st.bar_chart(daily_notional, use_container_width=True)
+
+    st.markdown("### Trade Detail")
+    st.dataframe(
+        trades.style.format(
+            {
+                "close_price": "{:,.2f}",
+                "notional": "{:,.2f}",
+            }
+        ),
+        use_container_width=True,
+    )
+
 # -----------------------------
 # Cash Analysis
 # -----------------------------
 elif section == "Cash Analysis":
     st.subheader("Cash Analysis")
 
-    cash_ts = get_cash_timeseries()
+    cash_ts = run_query(get_cash_timeseries)
     cash_ts["date"] = pd.to_datetime(cash_ts["date"])
 
     st.markdown("### Cash Balance Over Time")
@@ -225,5 +511,72 @@ elif section == "Cash Analysis":
         "Select date", cash_ts["date"].dt.strftime("%Y-%m-%d").tolist()
     )
 
-    explanation = explain_cash_change(date)
+    explanation = run_query(explain_cash_change, date)
     st.text(explanation)
+
+# -----------------------------
+# Data Export
+# -----------------------------
+elif section == "Data Export":
+    st.subheader("Data Export")
+    st.caption(
+        "Rows are streamed from the database to a file in chunks, but the "
+        "finished file is held in memory to serve the download. For very "
+        "long ranges use export_results.py, which writes straight to disk."
+    )
+
+    datasets = {
+        "Portfolio breakdown history": "breakdown",
+        "NAV time series": "nav",
+        "Daily NAV detail": "nav-daily",
+        "Cash balances": "cash",
+    }
+    mime_types = {
+        "csv": "text/csv",
+        "jsonl": "application/x-ndjson",
+        "parquet": "application/vnd.apache.parquet",
+    }
+
+    dataset_label = st.selectbox("Dataset", list(datasets))
+    dataset = datasets[dataset_label]
+
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        start_date = st.selectbox("Start date", dates, index=0)
+
+    with col2:
+        end_date = st.selectbox("End date", dates, index=len(dates) - 1)
+
+    with col3:
+        fmt = st.selectbox("Format", list(mime_types))
+
+    if st.button("Prepare export"):
+        file_name = f"portfolio_{dataset}_{start_date}_{end_date}.{fmt}"
+
+        # A private file per export, so concurrent sessions never share one
+        fd, export_path = tempfile.mkstemp(suffix=f".{fmt}")
+        os.close(fd)
+
+        try:
+            # Exports stream whole ranges, so they run on the batch budget
+            try:
+                with time_budget(budget_for("batch")):
+                    row_count = run_query(export, dataset, fmt, export_path, start_date, end_date)
+            except ValueError as e:
+                st.error(str(e))
+                st.stop()
+
+            with open(export_path, "rb") as f:
+                export_bytes = f.read()
+        finally:
+            os.remove(export_path)
+
+        st.success(f"Exported {row_count:,} rows.")
+
+        st.download_button(
+            "Download export",
+            data=export_bytes,
+            file_name=file_name,
+            mime=mime_types[fmt],
+        )
@@ -1,5 +1,5 @@
 import re
-import sqlite3
+from db_queries import get_tickers
 from llm_explainer import extract_intent_with_llm
 
 
@@ -10,6 +10,7 @@ ALLOWED_INTENTS = {
     "HOLDING_QUERY",
     "CASH_QUERY",
     "CASH_CHANGE_EXPLAIN",
+    "TRADES_QUERY",
 }
 
 
@@ -17,12 +18,7 @@ ALLOWED_INTENTS = {
 # Helpers
 # -----------------------------
 def get_known_tickers():
-    conn = sqlite3.connect("portfolio.db")
-    cursor = conn.cursor()
-    cursor.execute("SELECT ticker FROM securities")
-    tickers = {row[0] for row in cursor.fetchall()}
-    conn.close()
-    return tickers
+    return set(get_tickers())
 
 
 KNOWN_TICKERS = get_known_tickers()
@@ -89,6 +85,14 @@ def parse_intent(question: str):
     if "big" in q and "move" in q:
         return {"intent": "BIG_NAV_MOVES"}
 
+    # Implied trades
+    if "trade" in q or "bought" in q or "sold" in q or "turnover" in q:
+        return {
+            "intent": "TRADES_QUERY",
+            "ticker": extract_ticker(question),
+            "date": extract_date(q),
+        }
+
     # Holdings
     if "holding" in q or "shares" in q or "position" in q:
         return {
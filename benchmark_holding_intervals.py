@@ -0,0 +1,276 @@
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import db_queries
+from holding_intervals import derive_holding_dates, derive_holding_intervals
+
+
+# -----------------------------
+# Daily-row reference queries
+# -----------------------------
+DAILY_NAV_ON_DATE = """
+SELECT
+    SUM(h.quantity * p.close_price_base) + c.amount_base AS nav
+FROM holdings h
+JOIN prices p
+    ON h.security_id = p.security_id
+    AND h.holding_date = p.price_date
+JOIN cash c
+    ON c.cash_date = h.holding_date
+WHERE h.holding_date = ?
+"""
+
+DAILY_BREAKDOWN = """
+SELECT
+    s.ticker,
+    s.security_name,
+    h.quantity,
+    p.close_price,
+    h.quantity * p.close_price_base AS market_value
+FROM holdings h
+JOIN prices p
+    ON h.security_id = p.security_id
+    AND h.holding_date = p.price_date
+JOIN securities s
+    ON s.security_id = h.security_id
+WHERE h.holding_date = ?
+ORDER BY market_value DESC
+"""
+
+DAILY_NAV_TIMESERIES = """
+SELECT
+    h.holding_date AS date,
+    SUM(h.quantity * p.close_price_base) + c.amount_base AS nav
+FROM holdings h
+JOIN prices p
+    ON h.security_id = p.security_id
+    AND h.holding_date = p.price_date
+JOIN cash c
+    ON c.cash_date = h.holding_date
+WHERE h.holding_date BETWEEN ? AND ?
+GROUP BY h.holding_date
+ORDER BY h.holding_date
+"""
+
+DAILY_HOLDING = """
+SELECT h.quantity
+FROM holdings h
+JOIN securities s
+    ON h.security_id = s.security_id
+WHERE s.ticker = ?
+  AND h.holding_date = ?
+"""
+
+SCHEMA = """
+CREATE TABLE securities (
+    security_id INTEGER PRIMARY KEY,
+    ticker TEXT NOT NULL UNIQUE,
+    security_name TEXT NOT NULL,
+    asset_class TEXT NOT NULL,
+    currency TEXT NOT NULL
+);
+
+CREATE TABLE prices (
+    price_date TEXT NOT NULL,
+    security_id INTEGER NOT NULL,
+    close_price REAL NOT NULL,
+    fx_rate REAL NOT NULL,
+    close_price_base REAL NOT NULL,
+    PRIMARY KEY (price_date, security_id)
+);
+
+CREATE TABLE cash (
+    cash_date TEXT PRIMARY KEY,
+    currency TEXT NOT NULL,
+    amount REAL NOT NULL,
+    fx_rate REAL NOT NULL,
+    amount_base REAL NOT NULL
+);
+"""
+
+DAILY_SCHEMA = """
+CREATE TABLE holdings (
+    holding_date TEXT NOT NULL,
+    security_id INTEGER NOT NULL,
+    quantity INTEGER NOT NULL,
+    PRIMARY KEY (holding_date, security_id)
+);
+"""
+
+INTERVAL_SCHEMA = """
+CREATE TABLE holding_intervals (
+    security_id INTEGER NOT NULL,
+    quantity INTEGER NOT NULL,
+    valid_from TEXT NOT NULL,
+    valid_to TEXT NOT NULL,
+    PRIMARY KEY (security_id, valid_from)
+);
+
+CREATE TABLE holding_dates (
+    holding_date TEXT PRIMARY KEY
+);
+"""
+
+
+# -----------------------------
+# Synthetic portfolio
+# -----------------------------
+def make_portfolio(n_securities, n_days, change_prob, seed=7):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2020-01-01", periods=n_days).strftime("%Y-%m-%d")
+    ids = np.arange(1, n_securities + 1)
+
+    securities = pd.DataFrame({
+        "security_id": ids,
+        "ticker": [f"S{i:05d}" for i in ids],
+        "security_name": [f"Security {i}" for i in ids],
+        "asset_class": "Equity",
+        "currency": "USD",
+    })
+
+    changes = rng.random((n_days, n_securities)) < change_prob
+    changes[0, :] = True
+    draws = rng.integers(10, 1000, size=(n_days, n_securities))
+    change_day = np.where(changes, np.arange(n_days)[:, None], 0)
+    last_change = np.maximum.accumulate(change_day, axis=0)
+    quantities = np.take_along_axis(draws, last_change, axis=0)
+
+    returns = rng.normal(0, 0.01, size=(n_days, n_securities))
+    prices = 100 * np.exp(np.cumsum(returns, axis=0))
+
+    grid = pd.MultiIndex.from_product([dates, ids], names=["date", "security_id"])
+    holdings = pd.DataFrame({
+        "holding_date": grid.get_level_values("date"),
+        "security_id": grid.get_level_values("security_id"),
+        "quantity": quantities.ravel(),
+    })
+    prices_df = pd.DataFrame({
+        "price_date": grid.get_level_values("date"),
+        "security_id": grid.get_level_values("security_id"),
+        "close_price": prices.ravel().round(4),
+        "fx_rate": 1.0,
+    })
+    prices_df["close_price_base"] = prices_df["close_price"]
+    cash = pd.DataFrame({
+        "cash_date": dates,
+        "currency": "USD",
+        "amount": rng.uniform(1e4, 1e5, size=n_days).round(2),
+        "fx_rate": 1.0,
+    })
+    cash["amount_base"] = cash["amount"]
+
+    return securities, prices_df, holdings, cash
+
+
+def build_db(path, schema, tables):
+    conn = sqlite3.connect(path)
+    conn.executescript(schema)
+    for name, df in tables.items():
+        df.to_sql(name, conn, if_exists="append", index=False)
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+
+
+def db_size(path):
+    conn = sqlite3.connect(path)
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    conn.close()
+    return page_count * page_size
+
+
+def time_call(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Daily-row vs interval holdings benchmark.")
+    parser.add_argument("--securities", type=int, default=500)
+    parser.add_argument("--days", type=int, default=750)
+    parser.add_argument("--change-prob", type=float, default=0.02)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    securities, prices, holdings, cash = make_portfolio(
+        args.securities, args.days, args.change_prob
+    )
+    intervals = derive_holding_intervals(holdings)
+    holding_dates = derive_holding_dates(holdings)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        daily_path = os.path.join(tmp, "daily.db")
+        interval_path = os.path.join(tmp, "intervals.db")
+        daily_only = os.path.join(tmp, "daily_holdings_only.db")
+        interval_only = os.path.join(tmp, "interval_holdings_only.db")
+
+        common = {"securities": securities, "prices": prices, "cash": cash}
+        build_db(daily_path, SCHEMA + DAILY_SCHEMA, {**common, "holdings": holdings})
+        build_db(interval_path, SCHEMA + INTERVAL_SCHEMA, {**common, "holding_intervals": intervals, "holding_dates": holding_dates})
+        build_db(daily_only, DAILY_SCHEMA, {"holdings": holdings})
+        build_db(interval_only, INTERVAL_SCHEMA, {"holding_intervals": intervals, "holding_dates": holding_dates})
+
+        print(f"Securities x days: {args.securities} x {args.days} "
+              f"(change probability {args.change_prob:.1%})")
+        print(f"Daily rows:        {len(holdings):,}")
+        print(f"Interval rows:     {len(intervals):,}")
+        print(f"Holdings storage:  {db_size(daily_only) / 1e6:,.2f} MB daily vs "
+              f"{db_size(interval_only) / 1e6:,.2f} MB intervals")
+        print()
+
+        dates = sorted(holdings["holding_date"].unique())
+        mid_date = dates[len(dates) // 2]
+        ticker = securities["ticker"].iloc[len(securities) // 2]
+
+        # Both sides reuse a single open connection
+        daily_conn = sqlite3.connect(daily_path)
+        db_queries.DB_PATH = interval_path
+        db_queries.enable_connection_pool(1)
+
+        cases = [
+            (
+                "get_nav_on_date",
+                lambda: daily_conn.execute(DAILY_NAV_ON_DATE, (mid_date,)).fetchone(),
+                lambda: db_queries.get_nav_on_date(mid_date),
+            ),
+            (
+                "get_portfolio_breakdown",
+                lambda: pd.read_sql(DAILY_BREAKDOWN, daily_conn, params=(mid_date,)),
+                lambda: db_queries.get_portfolio_breakdown(mid_date),
+            ),
+            (
+                "get_holding_on_date",
+                lambda: daily_conn.execute(DAILY_HOLDING, (ticker, mid_date)).fetchone(),
+                lambda: db_queries.get_holding_on_date(ticker, mid_date),
+            ),
+            (
+                "get_nav_timeseries",
+                lambda: pd.read_sql(DAILY_NAV_TIMESERIES, daily_conn, params=(dates[0], dates[-1])),
+                lambda: db_queries.get_nav_timeseries(dates[0], dates[-1]),
+            ),
+        ]
+
+        print(f"{'query':<26}{'daily ms':>12}{'interval ms':>14}")
+        for name, daily_fn, interval_fn in cases:
+            daily_ms = time_call(daily_fn, args.repeats) * 1000
+            interval_ms = time_call(interval_fn, args.repeats) * 1000
+            print(f"{name:<26}{daily_ms:>12.2f}{interval_ms:>14.2f}")
+
+        daily_conn.close()
+        db_queries.disable_connection_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import db_queries
+
+
+def build_cases(dates, tickers):
+    first, mid, last = dates[0], dates[len(dates) // 2], dates[-1]
+    ticker = tickers[len(tickers) // 2]
+
+    return [
+        ("get_nav_on_date", lambda: db_queries.get_nav_on_date(mid)),
+        ("get_portfolio_breakdown", lambda: db_queries.get_portfolio_breakdown(mid)),
+        ("get_nav_timeseries", lambda: db_queries.get_nav_timeseries(first, last)),
+        ("get_nav_daily_table", lambda: db_queries.get_nav_daily_table(first, last)),
+        ("get_holding_on_date", lambda: db_queries.get_holding_on_date(ticker, mid)),
+        ("get_cash_on_date", lambda: db_queries.get_cash_on_date(mid)),
+        ("get_cash_timeseries", db_queries.get_cash_timeseries),
+        ("get_risk_metrics", lambda: db_queries.get_risk_metrics(first, last)),
+    ]
+
+
+def run_concurrent(fn, calls, sessions):
+    def timed(_):
+        start = time.perf_counter()
+        fn()
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=sessions) as executor:
+        return list(executor.map(timed, range(calls)))
+
+
+def p99(values):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Disk vs in-memory replica read latency.")
+    parser.add_argument("--db", default=db_queries.DB_PATH)
+    parser.add_argument("--calls", type=int, default=400)
+    parser.add_argument("--sessions", type=int, default=8)
+    args = parser.parse_args()
+
+    db_queries.DB_PATH = args.db
+    db_queries.disable_memory_replica()
+
+    dates = db_queries.get_available_dates()
+    tickers = db_queries.get_tickers()
+
+    if not dates:
+        raise ValueError(f"No portfolio data in {args.db}. Run the loader first.")
+
+    cases = build_cases(dates, tickers)
+    results = {}
+
+    for mode in ("disk", "memory"):
+        if mode == "memory":
+            # Warm the replica so the one-off backup is not timed
+            db_queries.enable_memory_replica().refresh_if_stale()
+
+        for name, fn in cases:
+            results[(name, mode)] = run_concurrent(fn, args.calls, args.sessions)
+
+    db_queries.disable_memory_replica()
+
+    print(f"{args.calls} calls per query across {args.sessions} concurrent sessions")
+    print()
+    print(f"{'query':<26}{'disk p50':>10}{'mem p50':>10}{'disk p99':>10}{'mem p99':>10}  (ms)")
+
+    for name, _ in cases:
+        disk, memory = results[(name, "disk")], results[(name, "memory")]
+        print(
+            f"{name:<26}"
+            f"{statistics.median(disk) * 1000:>10.2f}"
+            f"{statistics.median(memory) * 1000:>10.2f}"
+            f"{p99(disk) * 1000:>10.2f}"
+            f"{p99(memory) * 1000:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from scenario_engine import SCENARIO_BLOCK_SIZE, run_scenarios
+
+
+def make_positions(n_securities, n_asset_classes, n_currencies, rng):
+    return pd.DataFrame({
+        "ticker": [f"S{i:05d}" for i in range(n_securities)],
+        "asset_class": rng.integers(0, n_asset_classes, n_securities).astype(str),
+        "currency": rng.integers(0, n_currencies, n_securities).astype(str),
+        "market_value": rng.uniform(1e3, 1e6, n_securities),
+    })
+
+
+def make_scenarios(n_scenarios, positions, shocks_per_level, rng):
+    """Each scenario shocks a few asset classes, currencies and single names."""
+    frames = []
+    for level, column in (("asset_class", "asset_class"), ("currency", "currency"), ("security", "ticker")):
+        keys = positions[column].unique()
+        per_scenario = min(shocks_per_level, len(keys))
+        chosen = np.stack([
+            rng.choice(keys, per_scenario, replace=False) for _ in range(n_scenarios)
+        ])
+        frames.append(pd.DataFrame({
+            "scenario": np.repeat([f"scenario_{i}" for i in range(n_scenarios)], per_scenario),
+            "level": level,
+            "key": chosen.ravel(),
+            "shock": rng.normal(0, 0.05, n_scenarios * per_scenario).clip(-0.9, 0.9),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def naive_impact(positions, scenarios, n_check):
+    """Row-by-row reference for the first n_check scenarios."""
+    by_attr = {
+        "asset_class": positions.groupby("asset_class")["market_value"].sum(),
+        "currency": positions.groupby("currency")["market_value"].sum(),
+        "security": positions.set_index("ticker")["market_value"],
+    }
+    names = scenarios["scenario"].unique()[:n_check]
+    subset = scenarios[scenarios["scenario"].isin(names)]
+    impact = {}
+    for row in subset.itertuples(index=False):
+        exposure = by_attr[row.level].get(row.key, 0.0)
+        impact[row.scenario] = impact.get(row.scenario, 0.0) + exposure * row.shock
+    return impact
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scenario engine throughput benchmark.")
+    parser.add_argument("--scenarios", type=int, default=10000)
+    parser.add_argument("--securities", type=int, default=5000)
+    parser.add_argument("--asset-classes", type=int, default=12)
+    parser.add_argument("--currencies", type=int, default=10)
+    parser.add_argument("--shocks-per-level", type=int, default=3)
+    parser.add_argument("--block-size", type=int, default=SCENARIO_BLOCK_SIZE)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(11)
+    positions = make_positions(args.securities, args.asset_classes, args.currencies, rng)
+    scenarios = make_scenarios(args.scenarios, positions, args.shocks_per_level, rng)
+    nav = positions["market_value"].sum()
+
+    start = time.perf_counter()
+    results = run_scenarios(positions, scenarios, nav, block_size=args.block_size)
+    elapsed = time.perf_counter() - start
+
+    expected = naive_impact(positions, scenarios, 50)
+    got = results.set_index("scenario").loc[list(expected), "nav_impact"]
+    max_error = np.max(np.abs(got.to_numpy() - np.array(list(expected.values()))))
+
+    print(f"Scenarios x securities: {args.scenarios:,} x {args.securities:,}")
+    print(f"Shock rows:             {len(scenarios):,}")
+    print(f"Block size:             {args.block_size:,}")
+    print(f"Elapsed:                {elapsed:,.3f} s")
+    print(f"Throughput:             {args.scenarios / elapsed:,.0f} scenarios/s")
+    print(f"Max error vs reference: {max_error:.3e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,401 @@
+import contextvars
+import itertools
+import os
+import queue
 import sqlite3
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
 import pandas as pd
 
+from rule_engine import detect_big_nav_moves
+
 DB_PATH = "portfolio.db"
 
+# Set to "memory" to serve reads from an in-memory replica of DB_PATH
+REPLICA_ENV_VAR = "PORTFOLIO_DB_REPLICA"
+
+_pool = None
+_replica = None
+
 
 def get_connection():
     return sqlite3.connect(DB_PATH)
 
 
-def get_nav_on_date(date):
-    conn = get_connection()
-    cursor = conn.cursor()
+# -----------------------------
+# Connection pooling
+# -----------------------------
+class ConnectionPool:
+    """
+    Fixed-size pool of SQLite connections shared across threads.
+    Connections are opened lazily and reused until close_all().
+    """
 
-    query = """
+    def __init__(self, size, db_path=None):
+        self.db_path = db_path or DB_PATH
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._slots = queue.Queue(maxsize=size)
+        for _ in range(size):
+            self._slots.put(None)
+
+    def acquire(self):
+        self._slots.get()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return sqlite3.connect(self.db_path, check_same_thread=False)
+
+    def release(self, conn):
+        self._idle.put_nowait(conn)
+        self._slots.put(None)
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+def enable_connection_pool(size=8):
+    global _pool
+    disable_connection_pool()
+    _pool = ConnectionPool(size)
+    return _pool
+
+
+def disable_connection_pool():
+    global _pool
+    if _pool is not None:
+        _pool.close_all()
+        _pool = None
+
+
+# -----------------------------
+# In-memory replica
+# -----------------------------
+class MemoryReplica:
+    """
+    Shared-cache in-memory copy of the on-disk database, taken with the
+    SQLite backup API. The copy is replaced whenever the on-disk load
+    generation changes.
+    """
+
+    _names = itertools.count(1)
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or DB_PATH
+        self.generation = None
+        self._uri = None
+        self._anchor = None
+        self._disk_stamp = None
+        self._lock = threading.Lock()
+
+    def refresh_if_stale(self):
+        stat = os.stat(self.db_path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+
+        if stamp == self._disk_stamp:
+            return
+
+        with self._lock:
+            if stamp == self._disk_stamp:
+                return
+
+            disk = sqlite3.connect(self.db_path)
+            try:
+                generation = disk.execute("PRAGMA user_version").fetchone()[0]
+                if self._anchor is None or generation != self.generation:
+                    self._swap_in(disk, generation)
+            finally:
+                disk.close()
+
+            self._disk_stamp = stamp
+
+    def _swap_in(self, disk, generation):
+        # Each copy gets a fresh name so readers still holding the old
+        # one finish against a consistent database. The old copy is
+        # freed once its last connection closes.
+        uri = f"file:portfolio_replica_{next(self._names)}?mode=memory&cache=shared"
+        anchor = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        disk.backup(anchor)
+
+        old_anchor = self._anchor
+        self._uri, self._anchor, self.generation = uri, anchor, generation
+
+        if old_anchor is not None:
+            old_anchor.close()
+
+    def connect(self):
+        self.refresh_if_stale()
+        # Connect under the lock so a concurrent swap cannot close the
+        # anchor first; an unanchored name would open a new empty database.
+        # Once connected, the copy stays alive until this connection closes.
+        with self._lock:
+            return sqlite3.connect(self._uri, uri=True)
+
+    def close(self):
+        with self._lock:
+            if self._anchor is not None:
+                self._anchor.close()
+            self._uri = self._anchor = self._disk_stamp = self.generation = None
+
+
+def enable_memory_replica():
+    global _replica
+    disable_memory_replica()
+    _replica = MemoryReplica()
+    return _replica
+
+
+def disable_memory_replica():
+    global _replica
+    if _replica is not None:
+        _replica.close()
+        _replica = None
+
+
+# -----------------------------
+# Query time budgets
+# -----------------------------
+# Seconds a single connection() block may run before SQLite cancels it,
+# keyed by entry point. None means no limit. Override one with an
+# environment variable such as PORTFOLIO_TIME_BUDGET_DASHBOARD=2.5.
+TIME_BUDGETS = {
+    "dashboard": 5.0,
+    "assistant": 10.0,
+    "service": 5.0,
+    "batch": None,
+}
+TIME_BUDGET_ENV_PREFIX = "PORTFOLIO_TIME_BUDGET_"
+
+# SQLite VM instructions between deadline checks
+PROGRESS_HANDLER_STEPS = 10000
+
+_UNSET = object()
+_entry_point = None
+_default_budget = None
+_budget_override = contextvars.ContextVar("query_time_budget", default=_UNSET)
+
+_metrics_lock = threading.Lock()
+_timeouts = Counter()
+
+
+class QueryTimeoutError(TimeoutError):
+    """Raised when a query is cancelled for running past its time budget."""
+
+
+def set_entry_point(name):
+    """
+    Selects the default time budget for this process from TIME_BUDGETS.
+    Call once at start-up from each front end.
+    """
+    global _entry_point, _default_budget
+    _entry_point, _default_budget = name, budget_for(name)
+    return _default_budget
+
+
+def budget_for(name):
+    """Configured budget in seconds for an entry point, after env overrides."""
+    if name not in TIME_BUDGETS:
+        raise ValueError(
+            f"Unknown entry point: {name}. Use one of: {', '.join(TIME_BUDGETS)}"
+        )
+
+    env_value = os.environ.get(TIME_BUDGET_ENV_PREFIX + name.upper())
+    if env_value:
+        return None if env_value.lower() == "none" else float(env_value)
+    return TIME_BUDGETS[name]
+
+
+def get_time_budget():
+    budget = _budget_override.get()
+    return _default_budget if budget is _UNSET else budget
+
+
+@contextmanager
+def time_budget(seconds):
+    """Overrides the budget for queries run inside the block (None = no limit)."""
+    token = _budget_override.set(seconds)
+    try:
+        yield
+    finally:
+        _budget_override.reset(token)
+
+
+def _query_name(error):
+    # Inside connection() the traceback starts at connection() itself;
+    # the next frame is the function holding the with block, i.e. the
+    # query that ran out of time.
+    tb = error.__traceback__
+    while tb is not None and tb.tb_frame.f_code is connection.__wrapped__.__code__:
+        tb = tb.tb_next
+    return tb.tb_frame.f_code.co_name if tb is not None else "unknown"
+
+
+def _record_timeout(query):
+    with _metrics_lock:
+        _timeouts[(_entry_point or "default", query)] += 1
+
+
+def get_query_metrics():
+    """Timeout counts per entry point and query, most frequent first."""
+    with _metrics_lock:
+        counts = _timeouts.most_common()
+
+    return {
+        "total_timeouts": sum(count for _, count in counts),
+        "timeouts": [
+            {"entry_point": entry_point, "query": query, "count": count}
+            for (entry_point, query), count in counts
+        ],
+    }
+
+
+def reset_query_metrics():
+    with _metrics_lock:
+        _timeouts.clear()
+
+
+def _open_connection():
+    """Returns (conn, close) for the active read path."""
+    if _replica is not None:
+        return _replica.connect(), lambda conn: conn.close()
+
+    if _pool is None:
+        return get_connection(), lambda conn: conn.close()
+
+    def release(conn):
+        conn.rollback()
+        _pool.release(conn)
+
+    return _pool.acquire(), release
+
+
+@contextmanager
+def connection(query_name=None):
+    """
+    Read connection for one query. The time budget covers the whole
+    block, so for a generator it includes the time the consumer spends
+    between rows. query_name labels timeouts in the metrics; by default
+    it is the function holding the block.
+    """
+    conn, close = _open_connection()
+    budget = get_time_budget()
+    interrupted = []
+
+    if budget is not None:
+        deadline = time.monotonic() + budget
+
+        def check_deadline():
+            if time.monotonic() > deadline:
+                interrupted.append(True)
+                return 1
+            return 0
+
+        conn.set_progress_handler(check_deadline, PROGRESS_HANDLER_STEPS)
+
+    try:
+        yield conn
+    except Exception as e:
+        if not interrupted:
+            raise
+        query = query_name or _query_name(e)
+        _record_timeout(query)
+        raise QueryTimeoutError(
+            f"{query} was cancelled after exceeding its {budget:g}s time budget."
+        ) from e
+    finally:
+        if budget is not None:
+            conn.set_progress_handler(None, 0)
+        close(conn)
+
+
+def get_generation():
+    """
+    Load generation of the database. The loader bumps it on every
+    successful load, so it changes whenever the data changes.
+    """
+    with connection() as conn:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def get_tickers():
+    with connection() as conn:
+        rows = conn.execute("SELECT ticker FROM securities ORDER BY ticker").fetchall()
+    return [r[0] for r in rows]
+
+
+def get_available_dates():
+    with connection() as conn:
+        rows = conn.execute(
+            "SELECT DISTINCT holding_date FROM holdings ORDER BY holding_date"
+        ).fetchall()
+    return [r[0] for r in rows]
+
+
+# -----------------------------
+# Positions from holding intervals
+# -----------------------------
+# Expands holding_intervals into one row per security per holding date in
+# the requested range. Each price row finds the latest interval starting on
+# or before its date with one descending seek on the (security_id,
+# valid_from) primary key, then keeps it only if it has not ended. Price
+# dates without any holdings rows are skipped, as intervals run across them.
+# close_price is in the base currency; the local price stays in prices.
+def interval_lookup(security_id, date):
+    """valid_from of the latest interval for security_id starting on or before date."""
+    return f"""(
+            SELECT valid_from
+            FROM holding_intervals
+            WHERE security_id = {security_id}
+              AND valid_from <= {date}
+            ORDER BY valid_from DESC
+            LIMIT 1
+        )"""
+
+
+def positions_cte(start=":start_date", end=":end_date"):
+    return f"""
+    positions AS (
+        SELECT
+            p.price_date AS position_date,
+            hi.security_id,
+            hi.quantity,
+            p.close_price_base AS close_price
+        FROM prices p
+        JOIN holding_dates hd
+            ON hd.holding_date = p.price_date
+        JOIN holding_intervals hi
+            ON hi.security_id = p.security_id
+            AND hi.valid_from = {interval_lookup("p.security_id", "p.price_date")}
+        WHERE p.price_date BETWEEN {start} AND {end}
+          AND hi.valid_to >= p.price_date
+    )
+"""
+
+
+POSITIONS_CTE = positions_cte()
+
+
+def _date_range(start_date, end_date):
+    return {"start_date": start_date, "end_date": end_date}
+
+
+def get_nav_on_date(date):
+    query = "WITH" + POSITIONS_CTE + """
     SELECT
-        SUM(h.quantity * p.close_price) + c.amount AS nav
-    FROM holdings h
-    JOIN prices p
-        ON h.security_id = p.security_id
-        AND h.holding_date = p.price_date
+        SUM(pos.quantity * pos.close_price) + c.amount_base AS nav
+    FROM positions pos
     JOIN cash c
-        ON c.cash_date = h.holding_date
-    WHERE h.holding_date = ?
+        ON c.cash_date = pos.position_date
     """
 
-    cursor.execute(query, (date,))
-    row = cursor.fetchone()
-    conn.close()
+    with connection() as conn:
+        row = conn.execute(query, _date_range(date, date)).fetchone()
 
     if row is None or row[0] is None:
         raise ValueError(f"No NAV data found for {date}")
@@ -35,27 +404,223 @@ def get_nav_on_date(date):
 
 
 def get_portfolio_breakdown(date):
-    conn = get_connection()
-
-    query = """
+    query = "WITH" + POSITIONS_CTE + """
     SELECT
         s.ticker,
         s.security_name,
-        h.quantity,
-        p.close_price,
-        h.quantity * p.close_price AS market_value
-    FROM holdings h
-    JOIN prices p
-        ON h.security_id = p.security_id
-        AND h.holding_date = p.price_date
+        pos.quantity,
+        pos.close_price,
+        pos.quantity * pos.close_price AS market_value
+    FROM positions pos
     JOIN securities s
-        ON s.security_id = h.security_id
-    WHERE h.holding_date = ?
+        ON s.security_id = pos.security_id
     ORDER BY market_value DESC
     """
 
-    df = pd.read_sql(query, conn, params=(date,))
-    conn.close()
+    with connection() as conn:
+        df = pd.read_sql(query, conn, params=_date_range(date, date))
+    return df
+
+
+# -----------------------------
+# Portfolio snapshot
+# -----------------------------
+SNAPSHOT_TOP_N = 5
+
+
+def _snapshot_query(positions, where=""):
+    return "WITH" + positions + """,
+    nav_days AS (
+        SELECT
+            pos.position_date AS date,
+            SUM(pos.quantity * pos.close_price) AS invested,
+            c.amount_base AS cash,
+            SUM(pos.quantity * pos.close_price) + c.amount_base AS nav
+        FROM positions pos
+        JOIN cash c
+            ON c.cash_date = pos.position_date
+        GROUP BY pos.position_date
+    ),
+    nav_changes AS (
+        SELECT
+            *,
+            LAG(date) OVER (ORDER BY date) AS prev_date,
+            LAG(nav) OVER (ORDER BY date) AS prev_nav
+        FROM nav_days
+    )
+    SELECT
+        n.date,
+        s.ticker,
+        s.security_name,
+        pos.quantity,
+        pos.close_price,
+        pos.quantity * pos.close_price AS market_value,
+        pos.quantity * pos.close_price / n.invested AS weight,
+        n.nav,
+        n.cash,
+        n.invested,
+        n.prev_date,
+        n.prev_nav
+    FROM positions pos
+    JOIN securities s
+        ON s.security_id = pos.security_id
+    JOIN nav_changes n
+        ON n.date = pos.position_date
+    """ + where + """
+    ORDER BY n.date, market_value DESC
+    """
+
+
+# Positions for the requested date and the cash date before it, so the
+# NAV change comes out of the same pass.
+LIVE_SNAPSHOT_QUERY = _snapshot_query(
+    positions_cte(
+        start="(SELECT COALESCE(MAX(cash_date), :date) FROM cash WHERE cash_date < :date)",
+        end=":date",
+    ),
+    where="WHERE n.date = :date",
+)
+
+PRECOMPUTED_SNAPSHOT_QUERY = """
+SELECT
+    snapshot_date AS date,
+    ticker,
+    security_name,
+    quantity,
+    close_price,
+    market_value,
+    weight,
+    nav,
+    cash,
+    invested,
+    prev_date,
+    prev_nav
+FROM portfolio_snapshots
+WHERE snapshot_date = :date
+ORDER BY market_value DESC
+"""
+
+
+def insert_frame(conn, table, df):
+    """
+    Appends df to an existing table with executemany. Unlike to_sql it
+    never commits, so it can run inside the loader's transaction.
+    """
+    columns = ", ".join(df.columns)
+    placeholders = ", ".join("?" for _ in df.columns)
+    rows = df.astype(object).where(df.notna(), None)
+    conn.executemany(
+        f"INSERT INTO {table} ({columns}) VALUES ({placeholders})",
+        rows.itertuples(index=False, name=None),
+    )
+
+
+def build_portfolio_snapshots(conn):
+    """
+    Materialises snapshot rows for every date into portfolio_snapshots.
+    Called by the loader after the base tables are written.
+    """
+    conn.execute("DROP TABLE IF EXISTS portfolio_snapshots")
+    conn.execute(
+        """
+        CREATE TABLE portfolio_snapshots (
+            snapshot_date TEXT NOT NULL,
+            ticker TEXT NOT NULL,
+            security_name TEXT NOT NULL,
+            quantity INTEGER NOT NULL,
+            close_price REAL NOT NULL,
+            market_value REAL NOT NULL,
+            weight REAL NOT NULL,
+            nav REAL NOT NULL,
+            cash REAL NOT NULL,
+            invested REAL NOT NULL,
+            prev_date TEXT,
+            prev_nav REAL,
+            PRIMARY KEY (snapshot_date, ticker)
+        )
+        """
+    )
+    conn.execute(
+        "INSERT INTO portfolio_snapshots " + _snapshot_query(POSITIONS_CTE),
+        _date_range("", "9999-12-31"),
+    )
+
+
+def get_portfolio_snapshot(date, top_n=SNAPSHOT_TOP_N, use_precomputed=True):
+    """
+    NAV, cash, breakdown with weights, top-N concentration and the change
+    against the previous date, from a single query.
+    """
+    with connection() as conn:
+        # Databases loaded before snapshots were precomputed lack the table
+        precomputed = use_precomputed and conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'portfolio_snapshots'"
+        ).fetchone() is not None
+
+        query = PRECOMPUTED_SNAPSHOT_QUERY if precomputed else LIVE_SNAPSHOT_QUERY
+        df = pd.read_sql(query, conn, params={"date": date})
+
+    if df.empty:
+        raise ValueError(f"No portfolio data found for {date}")
+
+    head = df.iloc[0]
+    nav = float(head["nav"])
+    prev_nav = None if pd.isna(head["prev_nav"]) else float(head["prev_nav"])
+    nav_change = None if prev_nav is None else nav - prev_nav
+
+    return {
+        "date": head["date"],
+        "nav": nav,
+        "cash": float(head["cash"]),
+        "invested": float(head["invested"]),
+        "prev_date": None if prev_nav is None else head["prev_date"],
+        "prev_nav": prev_nav,
+        "nav_change": nav_change,
+        "nav_change_pct": None if prev_nav is None else nav_change / prev_nav,
+        "top_n": top_n,
+        "top_n_weight": float(df["weight"].head(top_n).sum()),
+        "breakdown": df[
+            ["ticker", "security_name", "quantity", "close_price", "market_value", "weight"]
+        ],
+    }
+
+
+def get_security_exposures(date):
+    query = "WITH" + POSITIONS_CTE + """
+    SELECT
+        s.ticker,
+        s.asset_class,
+        s.currency,
+        pos.quantity,
+        pos.close_price,
+        pos.quantity * pos.close_price AS market_value
+    FROM positions pos
+    JOIN securities s
+        ON s.security_id = pos.security_id
+    ORDER BY s.ticker
+    """
+
+    with connection() as conn:
+        df = pd.read_sql(query, conn, params=_date_range(date, date))
+
+    if df.empty:
+        raise ValueError(f"No positions found for {date}")
+
+    return df
+
+
+def get_cash_exposure(date):
+    """Cash balance on a date as currency and base-currency market_value."""
+    with connection() as conn:
+        df = pd.read_sql(
+            "SELECT currency, amount_base AS market_value FROM cash WHERE cash_date = ?",
+            conn,
+            params=(date,),
+        )
+
+    if df.empty:
+        raise ValueError(f"No cash data found for {date}")
+
     return df
 
 
@@ -66,75 +631,67 @@ def get_nav_between_dates(start_date, end_date):
     return nav_start, nav_end, change
 
 
-def get_nav_timeseries(start_date, end_date):
-    conn = get_connection()
+NAV_TIMESERIES_QUERY = "WITH" + POSITIONS_CTE + """
+SELECT
+    pos.position_date AS date,
+    SUM(pos.quantity * pos.close_price) + c.amount_base AS nav
+FROM positions pos
+JOIN cash c
+    ON c.cash_date = pos.position_date
+GROUP BY pos.position_date
+ORDER BY pos.position_date
+"""
 
-    query = """
+NAV_DAILY_TABLE_QUERY = "WITH" + POSITIONS_CTE + """,
+daily_nav AS (
     SELECT
-        h.holding_date AS date,
-        SUM(h.quantity * p.close_price) + c.amount AS nav
-    FROM holdings h
-    JOIN prices p
-        ON h.security_id = p.security_id
-        AND h.holding_date = p.price_date
+        pos.position_date AS date,
+        SUM(pos.quantity * pos.close_price) + c.amount_base AS nav
+    FROM positions pos
     JOIN cash c
-        ON c.cash_date = h.holding_date
-    WHERE h.holding_date BETWEEN ? AND ?
-    GROUP BY h.holding_date
-    ORDER BY h.holding_date
-    """
+        ON c.cash_date = pos.position_date
+    GROUP BY pos.position_date
+)
+SELECT
+    date,
+    nav,
+    nav - LAG(nav) OVER (ORDER BY date) AS daily_change
+FROM daily_nav
+ORDER BY date
+"""
+
 
-    df = pd.read_sql(query, conn, params=(start_date, end_date))
-    conn.close()
+def get_nav_timeseries(start_date, end_date):
+    with connection() as conn:
+        df = pd.read_sql(
+            NAV_TIMESERIES_QUERY, conn, params=_date_range(start_date, end_date)
+        )
     return df
 
 
 def get_nav_daily_table(start_date, end_date):
-    conn = get_connection()
-
-    query = """
-    WITH daily_nav AS (
-        SELECT
-            h.holding_date AS date,
-            SUM(h.quantity * p.close_price) + c.amount AS nav
-        FROM holdings h
-        JOIN prices p
-            ON h.security_id = p.security_id
-            AND h.holding_date = p.price_date
-        JOIN cash c
-            ON c.cash_date = h.holding_date
-        WHERE h.holding_date BETWEEN ? AND ?
-        GROUP BY h.holding_date
-    )
-    SELECT
-        date,
-        nav,
-        nav - LAG(nav) OVER (ORDER BY date) AS daily_change
-    FROM daily_nav
-    ORDER BY date
-    """
-
-    df = pd.read_sql(query, conn, params=(start_date, end_date))
-    conn.close()
+    with connection() as conn:
+        df = pd.read_sql(
+            NAV_DAILY_TABLE_QUERY, conn, params=_date_range(start_date, end_date)
+        )
     return df
 
 
 def get_holding_on_date(ticker, date):
-    conn = get_connection()
-    cursor = conn.cursor()
-
     query = """
-    SELECT h.quantity
-    FROM holdings h
+    SELECT hi.quantity
+    FROM holding_intervals hi
     JOIN securities s
-        ON h.security_id = s.security_id
-    WHERE s.ticker = ?
-      AND h.holding_date = ?
+        ON hi.security_id = s.security_id
+    JOIN holding_dates hd
+        ON hd.holding_date = :date
+    WHERE s.ticker = :ticker
+      AND hi.valid_from = """ + interval_lookup("s.security_id", ":date") + """
+      AND hi.valid_to >= :date
     """
 
-    cursor.execute(query, (ticker, date))
-    row = cursor.fetchone()
-    conn.close()
+    with connection() as conn:
+        row = conn.execute(query, {"ticker": ticker, "date": date}).fetchone()
 
     if row is None:
         raise ValueError(f"No holding found for {ticker} on {date}")
@@ -143,15 +700,11 @@ def get_holding_on_date(ticker, date):
 
 
 def get_cash_on_date(date):
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    cursor.execute(
-        "SELECT amount FROM cash WHERE cash_date = ?",
-        (date,),
-    )
-    row = cursor.fetchone()
-    conn.close()
+    with connection() as conn:
+        row = conn.execute(
+            "SELECT amount_base FROM cash WHERE cash_date = ?",
+            (date,),
+        ).fetchone()
 
     if row is None:
         raise ValueError(f"No cash data found for {date}")
@@ -159,39 +712,254 @@ def get_cash_on_date(date):
     return row[0]
 
 
+# Cash is reported in the base currency, matching the NAV figures
+CASH_TIMESERIES_QUERY = """
+SELECT
+    cash_date AS date,
+    amount_base AS amount,
+    amount_base - LAG(amount_base) OVER (ORDER BY cash_date) AS daily_change
+FROM cash
+ORDER BY cash_date
+"""
+
+
 def get_cash_timeseries():
-    conn = get_connection()
+    with connection() as conn:
+        df = pd.read_sql(CASH_TIMESERIES_QUERY, conn)
+    return df
+
+
+# -----------------------------
+# Exposure cube
+# -----------------------------
+# Rollup marker in exposure_cube for "all asset classes" / "all currencies"
+EXPOSURE_ALL = "ALL"
+
+# Asset class under which cash balances appear in exposure_cube. Both
+# values are reserved: the loader rejects securities that use them.
+EXPOSURE_CASH = "Cash"
+
+
+def get_exposure(start_date, end_date, asset_class=None, currency=None):
+    """
+    Slice of the exposure cube over a date range. For each dimension,
+    pass a value to filter on it, EXPOSURE_ALL for the rollup across it,
+    or None for one row per value.
+    """
+    conditions = ["exposure_date BETWEEN ? AND ?"]
+    params = [start_date, end_date]
+
+    for column, value in (("asset_class", asset_class), ("currency", currency)):
+        if value is None:
+            conditions.append(f"{column} != ?")
+        else:
+            conditions.append(f"{column} = ?")
+        params.append(EXPOSURE_ALL if value is None else value)
+
+    query = f"""
+    SELECT
+        exposure_date AS date,
+        asset_class,
+        currency,
+        market_value,
+        weight
+    FROM exposure_cube
+    WHERE {" AND ".join(conditions)}
+    ORDER BY exposure_date, market_value DESC
+    """
+
+    with connection() as conn:
+        df = pd.read_sql(query, conn, params=params)
+    return df
+
+
+# -----------------------------
+# Implied trades
+# -----------------------------
+def get_implied_trades(start_date, end_date, ticker=None):
+    conditions = ["t.trade_date BETWEEN ? AND ?"]
+    params = [start_date, end_date]
+
+    if ticker is not None:
+        conditions.append("s.ticker = ?")
+        params.append(ticker)
+
+    query = f"""
+    SELECT
+        t.trade_date AS date,
+        s.ticker,
+        CASE WHEN t.quantity_delta > 0 THEN 'BUY' ELSE 'SELL' END AS side,
+        t.quantity_before,
+        t.quantity_after,
+        t.quantity_delta,
+        t.close_price,
+        t.notional
+    FROM implied_trades t
+    JOIN securities s
+        ON s.security_id = t.security_id
+    WHERE {" AND ".join(conditions)}
+    ORDER BY t.trade_date, ABS(t.notional) DESC
+    """
+
+    with connection() as conn:
+        df = pd.read_sql(query, conn, params=params)
+    return df
+
+
+def get_turnover_stats(start_date, end_date):
+    """
+    Bought and sold notional over the range, and turnover as the lesser
+    of the two over average NAV.
+    """
+    query = """
+    WITH trades AS (
+        SELECT
+            COUNT(*) AS trade_count,
+            COALESCE(SUM(CASE WHEN notional > 0 THEN notional END), 0) AS bought,
+            COALESCE(-SUM(CASE WHEN notional < 0 THEN notional END), 0) AS sold
+        FROM implied_trades
+        WHERE trade_date BETWEEN ? AND ?
+    ),
+    nav AS (
+        SELECT AVG(nav) AS average_nav
+        FROM risk_metrics
+        WHERE metric_date BETWEEN ? AND ?
+    )
+    SELECT trade_count, bought, sold, average_nav
+    FROM trades, nav
+    """
 
+    with connection() as conn:
+        row = conn.execute(
+            query, (start_date, end_date, start_date, end_date)
+        ).fetchone()
+
+    trade_count, bought, sold, average_nav = row
+
+    if average_nav is None:
+        raise ValueError(f"No NAV data found between {start_date} and {end_date}")
+
+    return {
+        "trade_count": trade_count,
+        "bought": bought,
+        "sold": sold,
+        "average_nav": average_nav,
+        "turnover": min(bought, sold) / average_nav,
+    }
+
+
+def get_risk_metrics(start_date, end_date):
     query = """
     SELECT
-        cash_date AS date,
-        amount,
-        amount - LAG(amount) OVER (ORDER BY cash_date) AS daily_change
-    FROM cash
-    ORDER BY cash_date
+        metric_date AS date,
+        nav,
+        cash_flow,
+        daily_return,
+        cumulative_twr,
+        rolling_return,
+        rolling_volatility,
+        drawdown,
+        max_drawdown
+    FROM risk_metrics
+    WHERE metric_date BETWEEN ? AND ?
+    ORDER BY metric_date
     """
 
-    df = pd.read_sql(query, conn)
-    conn.close()
+    with connection() as conn:
+        df = pd.read_sql(query, conn, params=(start_date, end_date))
     return df
 
 
-def explain_cash_change(date):
-    conn = get_connection()
-    cursor = conn.cursor()
+# -----------------------------
+# Streaming variants
+# -----------------------------
+# Generators yielding one dict per row. Rows are pulled from SQLite in
+# fetchmany() chunks, so memory use does not grow with the date range.
+STREAM_CHUNK_SIZE = 5000
+
+
+def _stream_query(name, query, params, chunk_size=STREAM_CHUNK_SIZE):
+    with connection(name) as conn:
+        cursor = conn.execute(query, params)
+        columns = [d[0] for d in cursor.description]
+
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            for row in rows:
+                yield dict(zip(columns, row))
+
+
+def iter_nav_timeseries(start_date, end_date, chunk_size=STREAM_CHUNK_SIZE):
+    return _stream_query(
+        "iter_nav_timeseries",
+        NAV_TIMESERIES_QUERY,
+        _date_range(start_date, end_date),
+        chunk_size,
+    )
+
+
+def iter_nav_daily_table(start_date, end_date, chunk_size=STREAM_CHUNK_SIZE):
+    return _stream_query(
+        "iter_nav_daily_table",
+        NAV_DAILY_TABLE_QUERY,
+        _date_range(start_date, end_date),
+        chunk_size,
+    )
+
+
+def iter_cash_timeseries(start_date=None, end_date=None, chunk_size=STREAM_CHUNK_SIZE):
+    # daily_change is computed over the full history before filtering,
+    # so the first exported row still carries its real change.
+    query = f"""
+    SELECT *
+    FROM ({CASH_TIMESERIES_QUERY})
+    WHERE date BETWEEN :start_date AND :end_date
+    ORDER BY date
+    """
+    return _stream_query(
+        "iter_cash_timeseries",
+        query,
+        _date_range(start_date or "", end_date or "9999-12-31"),
+        chunk_size,
+    )
+
+
+def iter_portfolio_breakdown(start_date, end_date, chunk_size=STREAM_CHUNK_SIZE):
+    query = "WITH" + POSITIONS_CTE + """
+    SELECT
+        pos.position_date AS date,
+        s.ticker,
+        s.security_name,
+        pos.quantity,
+        pos.close_price,
+        pos.quantity * pos.close_price AS market_value
+    FROM positions pos
+    JOIN securities s
+        ON s.security_id = pos.security_id
+    ORDER BY pos.position_date, market_value DESC
+    """
+    return _stream_query(
+        "iter_portfolio_breakdown",
+        query,
+        _date_range(start_date, end_date),
+        chunk_size,
+    )
 
+
+def explain_cash_change(date):
     query = """
     SELECT
         cash_date,
-        amount,
-        amount - LAG(amount) OVER (ORDER BY cash_date) AS cash_change
+        amount_base,
+        amount_base - LAG(amount_base) OVER (ORDER BY cash_date) AS cash_change
     FROM cash
     WHERE cash_date = ?
     """
 
-    cursor.execute(query, (date,))
-    row = cursor.fetchone()
-    conn.close()
+    with connection() as conn:
+        row = conn.execute(query, (date,)).fetchone()
 
     if row is None:
         raise ValueError(f"No cash data found for {date}")
@@ -208,3 +976,48 @@ def explain_cash_change(date):
         f"Ending balance: {amount:,.2f}\n"
         f"Daily change: {change:,.2f}"
     )
+
+
+
+def explain_nav_change(date):
+    snapshot = get_portfolio_snapshot(date)
+
+    if snapshot["prev_nav"] is None:
+        return (
+            f"NAV on {snapshot['date']}: {snapshot['nav']:,.2f}. "
+            "This is the first available date."
+        )
+
+    direction = "decreased" if snapshot["nav_change"] < 0 else "increased"
+
+    return (
+        f"NAV {direction} on {snapshot['date']}.\n"
+        f"Ending NAV: {snapshot['nav']:,.2f} "
+        f"(invested {snapshot['invested']:,.2f}, cash {snapshot['cash']:,.2f})\n"
+        f"Change since {snapshot['prev_date']}: {snapshot['nav_change']:,.2f} "
+        f"({snapshot['nav_change_pct']:.2%})"
+    )
+
+
+def get_big_nav_moves(threshold=0.03):
+    """Days whose cash flow adjusted return is at least threshold either way."""
+    query = """
+    SELECT
+        metric_date AS nav_date,
+        daily_return,
+        nav - LAG(nav) OVER (ORDER BY metric_date) AS daily_change
+    FROM risk_metrics
+    ORDER BY metric_date
+    """
+
+    with connection() as conn:
+        rows = conn.execute(query).fetchall()
+
+    nav_series = [
+        {"nav_date": nav_date, "daily_return": daily_return, "daily_change": daily_change}
+        for nav_date, daily_return, daily_change in rows
+    ]
+    return detect_big_nav_moves(nav_series, threshold)
+
+if os.getenv(REPLICA_ENV_VAR, "").lower() == "memory":
+    enable_memory_replica()
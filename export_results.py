@@ -0,0 +1,149 @@
+import argparse
+import csv
+import itertools
+import json
+import sys
+
+from db_queries import (
+    iter_nav_timeseries,
+    iter_nav_daily_table,
+    iter_cash_timeseries,
+    iter_portfolio_breakdown,
+    set_entry_point,
+)
+
+DATASETS = {
+    "nav": iter_nav_timeseries,
+    "nav-daily": iter_nav_daily_table,
+    "cash": iter_cash_timeseries,
+    "breakdown": iter_portfolio_breakdown,
+}
+
+FORMATS = ("csv", "jsonl", "parquet")
+
+PARQUET_BATCH_SIZE = 10000
+
+
+# -----------------------------
+# Writers
+# -----------------------------
+def write_csv(rows, out):
+    count = 0
+    writer = None
+
+    for row in rows:
+        if writer is None:
+            writer = csv.DictWriter(out, fieldnames=list(row))
+            writer.writeheader()
+        writer.writerow(row)
+        count += 1
+
+    return count
+
+
+def write_jsonl(rows, out):
+    count = 0
+
+    for row in rows:
+        out.write(json.dumps(row))
+        out.write("\n")
+        count += 1
+
+    return count
+
+
+def write_parquet(rows, path, batch_size=PARQUET_BATCH_SIZE):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ValueError("Parquet export requires the pyarrow package.") from e
+
+    count = 0
+    writer = None
+    rows = iter(rows)
+
+    try:
+        while True:
+            batch = list(itertools.islice(rows, batch_size))
+            if not batch:
+                break
+
+            table = pa.Table.from_pylist(batch)
+
+            if writer is None:
+                # Columns that are entirely null in the first batch would
+                # otherwise be typed as null and reject later values.
+                schema = pa.schema([
+                    f.with_type(pa.float64()) if pa.types.is_null(f.type) else f
+                    for f in table.schema
+                ])
+                writer = pq.ParquetWriter(path, schema)
+
+            writer.write_table(table.cast(writer.schema))
+            count += len(batch)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return count
+
+
+# -----------------------------
+# Export
+# -----------------------------
+def iter_dataset(dataset, start_date=None, end_date=None):
+    if dataset not in DATASETS:
+        raise ValueError(f"Unknown dataset {dataset}. Choose from: {', '.join(DATASETS)}")
+
+    if dataset == "cash":
+        return iter_cash_timeseries(start_date, end_date)
+
+    if not start_date or not end_date:
+        raise ValueError(f"Dataset {dataset} needs a start and end date.")
+
+    return DATASETS[dataset](start_date, end_date)
+
+
+def export(dataset, fmt, output, start_date=None, end_date=None):
+    """
+    Streams a dataset to output (a path, or "-" for stdout) in the given
+    format and returns the number of rows written.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt}. Choose from: {', '.join(FORMATS)}")
+
+    rows = iter_dataset(dataset, start_date, end_date)
+
+    if fmt == "parquet":
+        if output == "-":
+            raise ValueError("Parquet export needs an output file path.")
+        return write_parquet(rows, output)
+
+    writer = write_csv if fmt == "csv" else write_jsonl
+
+    if output == "-":
+        return writer(rows, sys.stdout)
+
+    with open(output, "w", newline="", encoding="utf-8") as out:
+        return writer(rows, out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream portfolio query results to a file.")
+    parser.add_argument("dataset", choices=sorted(DATASETS))
+    parser.add_argument("--start", help="Start date (YYYY-MM-DD)")
+    parser.add_argument("--end", help="End date (YYYY-MM-DD)")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--output", default="-", help="Output path, or - for stdout")
+    args = parser.parse_args()
+
+    set_entry_point("batch")
+    count = export(args.dataset, args.format, args.output, args.start, args.end)
+
+    if args.output != "-":
+        print(f"Exported {count:,} rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
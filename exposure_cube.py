@@ -0,0 +1,121 @@
+from db_queries import EXPOSURE_ALL, EXPOSURE_CASH, POSITIONS_CTE
+
+EXPOSURE_CUBE_TABLE = """
+CREATE TABLE exposure_cube (
+    exposure_date TEXT NOT NULL,
+    asset_class TEXT NOT NULL,
+    currency TEXT NOT NULL,
+    market_value REAL NOT NULL,
+    weight REAL NOT NULL,
+    PRIMARY KEY (asset_class, currency, exposure_date)
+)
+"""
+
+EXPOSURE_CUBE_DATE_INDEX = """
+CREATE INDEX idx_exposure_cube_date
+    ON exposure_cube (exposure_date)
+"""
+
+# Market value per date x asset_class x currency, with cash as its own
+# asset class, plus rollups where either or both dimensions are ALL.
+# Weights are shares of NAV, so the ALL x ALL row is NAV at weight 1.
+BUILD_EXPOSURE_CUBE_QUERY = "WITH" + POSITIONS_CTE + """,
+base AS (
+    SELECT
+        pos.position_date AS date,
+        s.asset_class,
+        s.currency,
+        SUM(pos.quantity * pos.close_price) AS market_value
+    FROM positions pos
+    JOIN securities s
+        ON s.security_id = pos.security_id
+    JOIN cash c
+        ON c.cash_date = pos.position_date
+    GROUP BY pos.position_date, s.asset_class, s.currency
+
+    UNION ALL
+
+    SELECT
+        c.cash_date,
+        :cash,
+        c.currency,
+        c.amount_base
+    FROM cash c
+    WHERE c.cash_date IN (SELECT position_date FROM positions)
+),
+cube AS (
+    SELECT date, asset_class, currency, market_value
+    FROM base
+
+    UNION ALL
+
+    SELECT date, asset_class, :all, SUM(market_value)
+    FROM base
+    GROUP BY date, asset_class
+
+    UNION ALL
+
+    SELECT date, :all, currency, SUM(market_value)
+    FROM base
+    GROUP BY date, currency
+
+    UNION ALL
+
+    SELECT date, :all, :all, SUM(market_value)
+    FROM base
+    GROUP BY date
+),
+nav AS (
+    SELECT date, market_value AS nav
+    FROM cube
+    WHERE asset_class = :all AND currency = :all
+)
+SELECT
+    cube.date,
+    cube.asset_class,
+    cube.currency,
+    cube.market_value,
+    cube.market_value / nav.nav
+FROM cube
+JOIN nav
+    ON nav.date = cube.date
+"""
+
+
+def validate_exposure_keys(securities_df, cash_df):
+    """
+    Rejects securities and cash balances whose asset class or currency
+    would collide with the cube's reserved cash and rollup keys.
+    """
+    bad_securities = securities_df[
+        securities_df["asset_class"].isin([EXPOSURE_ALL, EXPOSURE_CASH])
+        | (securities_df["currency"] == EXPOSURE_ALL)
+    ]
+    if not bad_securities.empty:
+        raise ValueError(
+            f"Asset classes {EXPOSURE_ALL} and {EXPOSURE_CASH} and currency "
+            f"{EXPOSURE_ALL} are reserved. Offending securities:\n"
+            + bad_securities[["ticker", "asset_class", "currency"]].to_string(index=False)
+        )
+
+    if (cash_df["currency"] == EXPOSURE_ALL).any():
+        raise ValueError(f"Cash currency {EXPOSURE_ALL} is reserved.")
+
+
+def build_exposure_cube(conn):
+    """
+    Rebuilds the exposure_cube table from the loaded holdings, prices,
+    securities and cash. Called by the loader.
+    """
+    conn.execute("DROP TABLE IF EXISTS exposure_cube")
+    conn.execute(EXPOSURE_CUBE_TABLE)
+    conn.execute(
+        "INSERT INTO exposure_cube " + BUILD_EXPOSURE_CUBE_QUERY,
+        {
+            "start_date": "",
+            "end_date": "9999-12-31",
+            "all": EXPOSURE_ALL,
+            "cash": EXPOSURE_CASH,
+        },
+    )
+    conn.execute(EXPOSURE_CUBE_DATE_INDEX)
@@ -0,0 +1,85 @@
+import pandas as pd
+
+# All stored market values and NAV figures are expressed in this currency
+BASE_CURRENCY = "USD"
+
+FX_COLUMNS = ["rate_date", "currency", "rate"]
+
+
+def validate_fx_rates(fx_df):
+    """
+    Checks an fx_rates sheet with columns rate_date, currency, rate.
+    rate is the number of base currency units per one unit of currency.
+    """
+    missing = [c for c in FX_COLUMNS if c not in fx_df.columns]
+    if missing:
+        raise ValueError(f"FX rates sheet is missing columns: {', '.join(missing)}")
+
+    df = fx_df[FX_COLUMNS].copy()
+    df["currency"] = df["currency"].astype(str).str.strip().str.upper()
+    df["rate"] = pd.to_numeric(df["rate"], errors="raise").astype(float)
+
+    if (df["rate"] <= 0).any():
+        raise ValueError("FX rates must be positive.")
+
+    duplicates = df[df.duplicated(["rate_date", "currency"], keep=False)]
+    if not duplicates.empty:
+        raise ValueError(
+            "Duplicate FX rates found:\n" + duplicates.to_string(index=False)
+        )
+
+    return df
+
+
+def attach_fx_rates(df, date_column, currency_column, fx_df, base_currency=BASE_CURRENCY):
+    """
+    Returns df with an fx_rate column holding the latest rate on or
+    before each row's date for its currency, found with one as-of merge
+    over the whole frame. Rows already in the base currency get 1.0.
+    """
+    rows = df.assign(
+        _row=range(len(df)),
+        _date=pd.to_datetime(df[date_column]).astype("datetime64[ns]"),
+        _currency=df[currency_column].str.upper(),
+    ).sort_values("_date")
+
+    rates = fx_df[fx_df["currency"] != base_currency].assign(
+        _date=lambda r: pd.to_datetime(r["rate_date"]).astype("datetime64[ns]"),
+    ).sort_values("_date")
+
+    merged = pd.merge_asof(
+        rows,
+        rates[["_date", "currency", "rate"]].rename(columns={"currency": "_currency"}),
+        on="_date",
+        by="_currency",
+        direction="backward",
+    )
+    merged.loc[merged["_currency"] == base_currency, "rate"] = 1.0
+
+    unconverted = merged[merged["rate"].isna()]
+    if not unconverted.empty:
+        raise ValueError(
+            f"No FX rate to {base_currency} on or before these dates:\n"
+            + unconverted.groupby(currency_column)[date_column]
+            .agg(first_date="min", last_date="max", rows="count")
+            .to_string()
+        )
+
+    merged = merged.sort_values("_row").set_index(df.index)
+    return df.assign(fx_rate=merged["rate"])
+
+
+def convert_prices(prices_df, securities_df, fx_df):
+    """Adds fx_rate and close_price_base using each security's currency."""
+    currencies = securities_df.set_index("security_id")["currency"]
+    df = prices_df.assign(currency=prices_df["security_id"].map(currencies))
+    df = attach_fx_rates(df, "price_date", "currency", fx_df)
+    df["close_price_base"] = df["close_price"] * df["fx_rate"]
+    return df[["price_date", "security_id", "close_price", "fx_rate", "close_price_base"]]
+
+
+def convert_cash(cash_df, fx_df):
+    """Adds fx_rate and amount_base to the daily cash balances."""
+    df = attach_fx_rates(cash_df, "cash_date", "currency", fx_df)
+    df["amount_base"] = df["amount"] * df["fx_rate"]
+    return df
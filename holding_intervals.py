@@ -0,0 +1,43 @@
+import pandas as pd
+
+
+def derive_holding_intervals(holdings_df):
+    """
+    Collapses daily holdings rows into position intervals.
+
+    A new interval starts whenever a security's quantity changes or the
+    security is missing on one of the portfolio's holding dates.
+    valid_from and valid_to are both inclusive.
+    """
+    dates = sorted(holdings_df["holding_date"].unique())
+    date_index = {d: i for i, d in enumerate(dates)}
+
+    df = holdings_df.sort_values(["security_id", "holding_date"]).copy()
+    df["day"] = df["holding_date"].map(date_index)
+
+    new_interval = (
+        (df["security_id"] != df["security_id"].shift(1))
+        | (df["quantity"] != df["quantity"].shift(1))
+        | (df["day"] != df["day"].shift(1) + 1)
+    )
+    df["interval_id"] = new_interval.cumsum()
+
+    intervals = df.groupby("interval_id").agg(
+        security_id=("security_id", "first"),
+        quantity=("quantity", "first"),
+        valid_from=("holding_date", "min"),
+        valid_to=("holding_date", "max"),
+    )
+
+    return intervals.reset_index(drop=True)[
+        ["security_id", "quantity", "valid_from", "valid_to"]
+    ]
+
+
+def derive_holding_dates(holdings_df):
+    """
+    Distinct dates that have holdings rows. Intervals only bridge these
+    dates, so positions are read on them and nowhere in between.
+    """
+    dates = sorted(holdings_df["holding_date"].unique())
+    return pd.DataFrame({"holding_date": dates})
@@ -10,7 +10,8 @@ ALLOWED_INTENTS = [
     "EXPLAIN_DAY",
     "BIG_NAV_MOVES",
     "HOLDING_QUERY",
-    "CASH_QUERY"
+    "CASH_QUERY",
+    "TRADES_QUERY",
 ]
 
 
@@ -31,7 +32,8 @@ def extract_intent_with_llm(question: str) -> dict:
         "- EXPLAIN_DAY (date)\n"
         "- BIG_NAV_MOVES\n"
         "- HOLDING_QUERY (ticker, date)\n"
-        "- CASH_QUERY (date)\n\n"
+        "- CASH_QUERY (date)\n"
+        "- TRADES_QUERY (ticker, date)\n\n"
         "Rules:\n"
         "- Return ONLY valid JSON\n"
         "- Do NOT explain\n"
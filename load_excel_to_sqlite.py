@@ -1,7 +1,15 @@
+import hashlib
 import sqlite3
 import pandas as pd
 import sys
 
+from db_queries import build_portfolio_snapshots, insert_frame
+from exposure_cube import build_exposure_cube, validate_exposure_keys
+from fx_rates import FX_COLUMNS, convert_cash, convert_prices, validate_fx_rates
+from holding_intervals import derive_holding_dates, derive_holding_intervals
+from metrics_engine import update_risk_metrics
+from trade_engine import update_implied_trades
+
 
 def normalise_date_column(df, column_name):
     df[column_name] = pd.to_datetime(
@@ -34,6 +42,14 @@ def validate_prices(prices_df):
     return prices_df[["price_date", "security_id", "close_price"]]
 
 
+def content_hash(frames):
+    digest = hashlib.sha1()
+    for df in frames:
+        digest.update(repr(list(df.columns)).encode("utf-8"))
+        digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return digest.hexdigest()
+
+
 # -----------------------------
 # Read Excel path from argument
 # -----------------------------
@@ -42,22 +58,59 @@ if len(sys.argv) < 2:
 
 excel_file = sys.argv[1]
 
+# -----------------------------
+# Load and validate Excel sheets before touching the database
+# -----------------------------
+securities_df = pd.read_excel(excel_file, sheet_name="securities")
+prices_df = pd.read_excel(excel_file, sheet_name="prices")
+holdings_df = pd.read_excel(excel_file, sheet_name="holdings")
+cash_df = pd.read_excel(excel_file, sheet_name="cash")
+
+# FX rates are optional while every currency is the base currency
+if "fx_rates" in pd.ExcelFile(excel_file).sheet_names:
+    fx_rates_df = pd.read_excel(excel_file, sheet_name="fx_rates")
+else:
+    fx_rates_df = pd.DataFrame(columns=FX_COLUMNS)
+
+prices_df = normalise_date_column(prices_df, "price_date")
+holdings_df = normalise_date_column(holdings_df, "holding_date")
+cash_df = normalise_date_column(cash_df, "cash_date")
+fx_rates_df = normalise_date_column(fx_rates_df, "rate_date")
+
+prices_df = validate_prices(prices_df)
+validate_exposure_keys(securities_df, cash_df)
+fx_rates_df = validate_fx_rates(fx_rates_df)
+prices_df = convert_prices(prices_df, securities_df, fx_rates_df)
+cash_df = convert_cash(cash_df, fx_rates_df)
+holding_intervals_df = derive_holding_intervals(holdings_df)
+holding_dates_df = derive_holding_dates(holdings_df)
+
 # -----------------------------
 # Connect to SQLite
 # -----------------------------
-conn = sqlite3.connect("portfolio.db")
+# Autocommit mode so the explicit BEGIN below is the only transaction.
+# Everything up to COMMIT, derived tables and the generation bump
+# included, replaces the old data in one step: readers see either the
+# previous load or this one, never a mix.
+conn = sqlite3.connect("portfolio.db", isolation_level=None)
 cursor = conn.cursor()
 
 cursor.execute("PRAGMA foreign_keys = ON;")
 
 cursor.executescript("""
+BEGIN;
+
 DROP TABLE IF EXISTS prices;
+DROP TABLE IF EXISTS holding_intervals;
+DROP TABLE IF EXISTS holding_dates;
 DROP TABLE IF EXISTS holdings;
 DROP TABLE IF EXISTS cash;
+DROP TABLE IF EXISTS fx_rates;
 DROP TABLE IF EXISTS securities;
-""")
 
-cursor.executescript("""
+-- Superseded by the per-date derived_inputs digests
+DROP TABLE IF EXISTS derived_watermarks;
+
 CREATE TABLE securities (
     security_id INTEGER PRIMARY KEY,
     ticker TEXT NOT NULL UNIQUE,
@@ -70,6 +123,8 @@ CREATE TABLE prices (
     price_date TEXT NOT NULL,
     security_id INTEGER NOT NULL,
     close_price REAL NOT NULL CHECK (close_price > 0),
+    fx_rate REAL NOT NULL CHECK (fx_rate > 0),
+    close_price_base REAL NOT NULL,
     PRIMARY KEY (price_date, security_id),
     FOREIGN KEY (security_id) REFERENCES securities(security_id)
 );
@@ -82,36 +137,79 @@ CREATE TABLE holdings (
     FOREIGN KEY (security_id) REFERENCES securities(security_id)
 );
 
+CREATE TABLE holding_intervals (
+    security_id INTEGER NOT NULL,
+    quantity INTEGER NOT NULL CHECK (quantity > 0),
+    valid_from TEXT NOT NULL,
+    valid_to TEXT NOT NULL CHECK (valid_to >= valid_from),
+    PRIMARY KEY (security_id, valid_from),
+    FOREIGN KEY (security_id) REFERENCES securities(security_id)
+);
+
+CREATE TABLE holding_dates (
+    holding_date TEXT PRIMARY KEY
+);
+
 CREATE TABLE cash (
     cash_date TEXT PRIMARY KEY,
     currency TEXT NOT NULL,
-    amount REAL NOT NULL CHECK (amount >= 0)
+    amount REAL NOT NULL CHECK (amount >= 0),
+    fx_rate REAL NOT NULL CHECK (fx_rate > 0),
+    amount_base REAL NOT NULL
+);
+
+CREATE TABLE fx_rates (
+    rate_date TEXT NOT NULL,
+    currency TEXT NOT NULL,
+    rate REAL NOT NULL CHECK (rate > 0),
+    PRIMARY KEY (currency, rate_date)
 );
 """)
 
 # -----------------------------
-# Load Excel sheets
+# Write to database
 # -----------------------------
-securities_df = pd.read_excel(excel_file, sheet_name="securities")
-prices_df = pd.read_excel(excel_file, sheet_name="prices")
-holdings_df = pd.read_excel(excel_file, sheet_name="holdings")
-cash_df = pd.read_excel(excel_file, sheet_name="cash")
-
-prices_df = normalise_date_column(prices_df, "price_date")
-holdings_df = normalise_date_column(holdings_df, "holding_date")
-cash_df = normalise_date_column(cash_df, "cash_date")
-
-prices_df = validate_prices(prices_df)
+# insert_frame rather than to_sql, which commits after every table
+insert_frame(cursor, "securities", securities_df)
+insert_frame(cursor, "prices", prices_df)
+insert_frame(cursor, "holdings", holdings_df)
+insert_frame(cursor, "holding_intervals", holding_intervals_df)
+insert_frame(cursor, "holding_dates", holding_dates_df)
+insert_frame(cursor, "cash", cash_df)
+insert_frame(cursor, "fx_rates", fx_rates_df)
 
 # -----------------------------
-# Write to database
+# Derived series
 # -----------------------------
-securities_df.to_sql("securities", conn, if_exists="append", index=False)
-prices_df.to_sql("prices", conn, if_exists="append", index=False)
-holdings_df.to_sql("holdings", conn, if_exists="append", index=False)
-cash_df.to_sql("cash", conn, if_exists="append", index=False)
+build_portfolio_snapshots(conn)
+build_exposure_cube(conn)
+update_risk_metrics(conn)
+update_implied_trades(conn)
+
+# Bump the load generation so caches and readers can detect new data.
+# Reloading identical content keeps the generation, so response caches,
+# ETags and the in-memory replica stay valid.
+cursor.execute("""
+CREATE TABLE IF NOT EXISTS load_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    content_hash TEXT NOT NULL
+)
+""")
+
+loaded_hash = content_hash(
+    [securities_df, prices_df, holdings_df, cash_df, fx_rates_df]
+)
+previous = cursor.execute("SELECT content_hash FROM load_state").fetchone()
+
+if previous is None or previous[0] != loaded_hash:
+    generation = cursor.execute("PRAGMA user_version").fetchone()[0] + 1
+    cursor.execute(f"PRAGMA user_version = {generation}")
+    cursor.execute(
+        "INSERT OR REPLACE INTO load_state (id, content_hash) VALUES (1, ?)",
+        (loaded_hash,),
+    )
 
-conn.commit()
+cursor.execute("COMMIT")
 conn.close()
 
 print("Database created and Excel data loaded successfully.")
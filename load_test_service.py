@@ -0,0 +1,93 @@
+import argparse
+import json
+import random
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def fetch(url, etag=None):
+    request = urllib.request.Request(url)
+    if etag:
+        request.add_header("If-None-Match", etag)
+
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request) as response:
+            response.read()
+            status = response.status
+            etag = response.headers.get("ETag")
+    except urllib.error.HTTPError as e:
+        e.read()
+        status = e.code
+        etag = e.headers.get("ETag")
+    return status, etag, time.perf_counter() - start
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def build_paths(base_url):
+    with urllib.request.urlopen(f"{base_url}/dates") as response:
+        dates = json.loads(response.read())["dates"]
+
+    if not dates:
+        raise ValueError("Service has no portfolio dates loaded.")
+
+    paths = []
+    for date in dates:
+        paths.append(f"/nav?date={date}")
+        paths.append(f"/breakdown?date={date}")
+        paths.append(f"/cash?date={date}")
+    paths.append(f"/nav/daily?start={dates[0]}&end={dates[-1]}")
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the portfolio query service.")
+    parser.add_argument("--url", default="http://127.0.0.1:8765")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument(
+        "--revalidate",
+        action="store_true",
+        help="Send If-None-Match with the last seen ETag for each path",
+    )
+    args = parser.parse_args()
+
+    base_url = args.url.rstrip("/")
+    paths = build_paths(base_url)
+    etags = {}
+
+    def one_request(_):
+        path = random.choice(paths)
+        status, etag, elapsed = fetch(
+            base_url + path, etags.get(path) if args.revalidate else None
+        )
+        if etag:
+            etags[path] = etag
+        return status, elapsed
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(one_request, range(args.requests)))
+    wall = time.perf_counter() - start
+
+    latencies = [elapsed for _, elapsed in results]
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+
+    print(f"Requests:     {len(results)} ({args.concurrency} concurrent)")
+    print(f"Status codes: {dict(sorted(statuses.items()))}")
+    print(f"Throughput:   {len(results) / wall:,.1f} req/s")
+    print(f"Latency p50:  {percentile(latencies, 50) * 1000:,.2f} ms")
+    print(f"Latency p99:  {percentile(latencies, 99) * 1000:,.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
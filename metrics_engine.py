@@ -0,0 +1,313 @@
+import math
+from collections import deque
+
+from db_queries import POSITIONS_CTE, interval_lookup
+
+ROLLING_WINDOW = 20
+TRADING_DAYS_PER_YEAR = 252
+END_OF_TIME = "9999-12-31"
+
+RISK_METRICS_TABLE = """
+CREATE TABLE IF NOT EXISTS risk_metrics (
+    metric_date TEXT PRIMARY KEY,
+    nav REAL NOT NULL,
+    cash_flow REAL NOT NULL,
+    daily_return REAL,
+    cumulative_twr REAL NOT NULL,
+    rolling_return REAL,
+    rolling_volatility REAL,
+    drawdown REAL NOT NULL,
+    max_drawdown REAL NOT NULL
+)
+"""
+
+# Shared by every engine that extends a derived table incrementally:
+# one digest per input date the engine has processed
+INPUT_DIGESTS_TABLE = """
+CREATE TABLE IF NOT EXISTS derived_inputs (
+    name TEXT NOT NULL,
+    input_date TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    PRIMARY KEY (name, input_date)
+)
+"""
+
+# Per-date aggregates of each input table. Weighting by security_id
+# catches values moved between securities on the same date.
+DIGEST_QUERIES = {
+    "prices": """
+        SELECT
+            price_date,
+            COUNT(*),
+            TOTAL(close_price_base),
+            TOTAL(close_price_base * security_id)
+        FROM prices
+        GROUP BY price_date
+    """,
+    "cash": """
+        SELECT cash_date, currency, amount, fx_rate, amount_base
+        FROM cash
+    """,
+    "holdings": """
+        SELECT
+            holding_date,
+            COUNT(*),
+            TOTAL(quantity),
+            TOTAL(quantity * security_id)
+        FROM holdings
+        GROUP BY holding_date
+    """,
+}
+
+# For each cash date: the NAV, and the previous day's positions and cash
+# valued at today's prices. The difference between the two is the
+# external cash flow for the day.
+DAILY_INPUTS_QUERY = "WITH" + POSITIONS_CTE + """,
+cash_days AS (
+    SELECT
+        cash_date AS date,
+        amount_base AS amount,
+        LAG(cash_date) OVER (ORDER BY cash_date) AS prev_date,
+        -- Yesterday's cash at today's rate, so FX moves count as return
+        CASE
+            WHEN LAG(currency) OVER (ORDER BY cash_date) = currency
+                THEN LAG(amount) OVER (ORDER BY cash_date) * fx_rate
+            ELSE LAG(amount_base) OVER (ORDER BY cash_date)
+        END AS prev_amount
+    FROM cash
+    WHERE cash_date IN (SELECT holding_date FROM holding_dates)
+),
+invested AS (
+    SELECT
+        position_date AS date,
+        SUM(quantity * close_price) AS value
+    FROM positions
+    GROUP BY position_date
+),
+carried AS (
+    SELECT
+        cd.date,
+        SUM(hi.quantity * p.close_price_base) AS value
+    FROM cash_days cd
+    -- CROSS JOIN keeps cash_days outermost, so prev_date is bound
+    -- before the interval seek instead of scanning every interval
+    CROSS JOIN prices p
+        ON p.price_date = cd.date
+    JOIN holding_intervals hi
+        ON hi.security_id = p.security_id
+        AND hi.valid_from = """ + interval_lookup("p.security_id", "cd.prev_date") + """
+    WHERE cd.date BETWEEN :start_date AND :end_date
+      AND hi.valid_to >= cd.prev_date
+    GROUP BY cd.date
+)
+SELECT
+    cd.date,
+    i.value + cd.amount AS nav,
+    COALESCE(c.value, 0) + cd.prev_amount AS carried_nav
+FROM cash_days cd
+JOIN invested i
+    ON i.date = cd.date
+LEFT JOIN carried c
+    ON c.date = cd.date
+WHERE cd.date BETWEEN :start_date AND :end_date
+ORDER BY cd.date
+"""
+
+
+class RiskMetricsState:
+    """
+    Running state for the risk and performance series.
+    Each update() consumes one day in O(1) time.
+    """
+
+    def __init__(self, window=ROLLING_WINDOW):
+        self.window = window
+        self.returns = deque()
+        self.return_sum = 0.0
+        self.return_sumsq = 0.0
+        self.index_history = deque(maxlen=window + 1)
+        self.index = 1.0
+        self.peak = 1.0
+        self.max_drawdown = 0.0
+        self.last_nav = None
+
+    def update(self, date, nav, carried_nav):
+        if self.last_nav is None:
+            daily_return = None
+            cash_flow = 0.0
+        else:
+            # Flows are assumed to land at the close, so the day's return
+            # is earned only on what was held coming into the day.
+            daily_return = carried_nav / self.last_nav - 1
+            cash_flow = nav - carried_nav
+            self.index *= 1 + daily_return
+            self._push_return(daily_return)
+
+        self.last_nav = nav
+        self.index_history.append(self.index)
+        self.peak = max(self.peak, self.index)
+        drawdown = self.index / self.peak - 1
+        self.max_drawdown = min(self.max_drawdown, drawdown)
+
+        return {
+            "metric_date": date,
+            "nav": nav,
+            "cash_flow": cash_flow,
+            "daily_return": daily_return,
+            "cumulative_twr": self.index - 1,
+            "rolling_return": self._rolling_return(),
+            "rolling_volatility": self._rolling_volatility(),
+            "drawdown": drawdown,
+            "max_drawdown": self.max_drawdown,
+        }
+
+    def _push_return(self, daily_return):
+        self.returns.append(daily_return)
+        self.return_sum += daily_return
+        self.return_sumsq += daily_return * daily_return
+
+        if len(self.returns) > self.window:
+            old = self.returns.popleft()
+            self.return_sum -= old
+            self.return_sumsq -= old * old
+
+    def _rolling_return(self):
+        if len(self.index_history) <= self.window:
+            return None
+        return self.index_history[-1] / self.index_history[0] - 1
+
+    def _rolling_volatility(self):
+        n = len(self.returns)
+        if n < self.window:
+            return None
+        variance = (self.return_sumsq - self.return_sum ** 2 / n) / (n - 1)
+        return math.sqrt(max(variance, 0.0) * TRADING_DAYS_PER_YEAR)
+
+    @classmethod
+    def from_rows(cls, rows, window=ROLLING_WINDOW):
+        """
+        Rebuilds the state from the last window + 1 persisted rows,
+        oldest first: (nav, daily_return, cumulative_twr, drawdown,
+        max_drawdown).
+        """
+        state = cls(window)
+        for nav, daily_return, cumulative_twr, drawdown, max_drawdown in rows:
+            if daily_return is not None:
+                state._push_return(daily_return)
+            state.index = cumulative_twr + 1
+            state.index_history.append(state.index)
+            state.peak = state.index / (drawdown + 1)
+            state.max_drawdown = max_drawdown
+            state.last_nav = nav
+        return state
+
+
+def input_digests(conn, tables=tuple(DIGEST_QUERIES)):
+    """
+    Digest of each input date as {date: text}, from one grouped SQL
+    query per table rather than hashing every row in Python.
+    """
+    digests = {}
+    for table in tables:
+        for date, *values in conn.execute(DIGEST_QUERIES[table]):
+            digests[date] = digests.get(date, "") + f"{table}{values!r}"
+    return digests
+
+
+def first_changed_date(conn, name, digests):
+    """
+    Earliest date whose digest differs from the one stored for name,
+    including dates added or removed since. None if nothing changed.
+    """
+    stored = dict(conn.execute(
+        "SELECT input_date, digest FROM derived_inputs WHERE name = ?", (name,)
+    ))
+    changed = [
+        date for date in stored.keys() | digests.keys()
+        if stored.get(date) != digests.get(date)
+    ]
+    return min(changed, default=None)
+
+
+def save_input_digests(conn, name, digests, after, through):
+    """Replaces the stored digests for name on dates in (after, through]."""
+    conn.execute(
+        "DELETE FROM derived_inputs WHERE name = ? AND input_date > ?", (name, after)
+    )
+    conn.executemany(
+        "INSERT INTO derived_inputs (name, input_date, digest) VALUES (?, ?, ?)",
+        [
+            (name, date, digest)
+            for date, digest in digests.items()
+            if after < date <= through
+        ],
+    )
+
+
+def _load_state(conn, window, changed_date):
+    """
+    State after the last processed day before changed_date, and that
+    day. (None, "") when there is nothing to resume from.
+    """
+    rows = conn.execute(
+        """
+        SELECT metric_date, nav, daily_return, cumulative_twr, drawdown, max_drawdown
+        FROM risk_metrics
+        WHERE metric_date < ?
+        ORDER BY metric_date DESC
+        LIMIT ?
+        """,
+        (changed_date, window + 1),
+    ).fetchall()
+
+    if not rows:
+        return None, ""
+
+    state = RiskMetricsState.from_rows((row[1:] for row in reversed(rows)), window)
+    return state, rows[0][0]
+
+
+def update_risk_metrics(conn, window=ROLLING_WINDOW):
+    """
+    Extends the persisted risk_metrics series with any dates after the
+    last processed one. If earlier inputs were restated, recomputes from
+    the first changed date onwards. Returns the number of days processed.
+    """
+    conn.execute(RISK_METRICS_TABLE)
+    conn.execute(INPUT_DIGESTS_TABLE)
+
+    digests = input_digests(conn)
+    changed_date = first_changed_date(conn, "risk_metrics", digests) or END_OF_TIME
+    state, last_date = _load_state(conn, window, changed_date)
+
+    conn.execute("DELETE FROM risk_metrics WHERE metric_date > ?", (last_date,))
+
+    if state is None:
+        state = RiskMetricsState(window)
+        inputs = conn.execute(
+            DAILY_INPUTS_QUERY, {"start_date": "", "end_date": END_OF_TIME}
+        ).fetchall()
+    else:
+        inputs = conn.execute(
+            DAILY_INPUTS_QUERY, {"start_date": last_date, "end_date": END_OF_TIME}
+        ).fetchall()[1:]
+
+    rows = [state.update(date, nav, carried_nav) for date, nav, carried_nav in inputs]
+
+    conn.executemany(
+        """
+        INSERT INTO risk_metrics (
+            metric_date, nav, cash_flow, daily_return, cumulative_twr,
+            rolling_return, rolling_volatility, drawdown, max_drawdown
+        )
+        VALUES (
+            :metric_date, :nav, :cash_flow, :daily_return, :cumulative_twr,
+            :rolling_return, :rolling_volatility, :drawdown, :max_drawdown
+        )
+        """,
+        rows,
+    )
+    through = rows[-1]["metric_date"] if rows else last_date
+    save_input_digests(conn, "risk_metrics", digests, last_date, through)
+
+    return len(rows)
@@ -1,4 +1,7 @@
 import sys
+
+import pandas as pd
+
 from assistant import parse_intent
 from db_queries import (
     get_nav_on_date,
@@ -6,10 +9,15 @@ from db_queries import (
     get_big_nav_moves,
     get_holding_on_date,
     get_cash_on_date,
+    get_implied_trades,
+    set_entry_point,
+    QueryTimeoutError,
 )
 
 
 def main():
+    set_entry_point("assistant")
+
     print("Portfolio assistant ready.")
     print("Examples:")
     print("NAV on 2025-01-13")
@@ -17,6 +25,7 @@ def main():
     print("What is my holding in NVDA on 2025-01-13")
     print("What was cash position on 2025-01-30")
     print("Show big moves")
+    print("What did we trade in NVDA")
     print("Type quit to exit\n")
 
     while True:
@@ -50,9 +59,16 @@ def main():
             # -----------------------------
             elif intent == "BIG_NAV_MOVES":
                 moves = get_big_nav_moves()
-                for m in moves:
-                    print(m)
-                print()
+
+                if not moves:
+                    print("No big NAV moves found.\n")
+                else:
+                    for m in moves:
+                        print(
+                            f"{m['nav_date']}: {m['daily_return']:+.2%} "
+                            f"({m['daily_change']:+,.2f})"
+                        )
+                    print()
 
             # -----------------------------
             # Holdings
@@ -75,9 +91,36 @@ def main():
                     f"Cash position on {date}: {cash:,.2f}\n"
                 )
 
+            # -----------------------------
+            # Implied trades
+            # -----------------------------
+            elif intent == "TRADES_QUERY":
+                ticker = intent_data.get("ticker")
+                date = intent_data.get("date")
+                trades = get_implied_trades(
+                    date or "", date or "9999-12-31", ticker
+                )
+
+                if trades.empty:
+                    print("No implied trades found.\n")
+                else:
+                    for t in trades.itertuples(index=False):
+                        # Trades on a date without a price have no value
+                        if pd.isna(t.close_price):
+                            value = "(no price)"
+                        else:
+                            value = f"@ {t.close_price:,.2f} = {abs(t.notional):,.2f}"
+                        print(
+                            f"{t.date} {t.side} {abs(t.quantity_delta):,} {t.ticker} {value}"
+                        )
+                    print()
+
             else:
                 print("I did not understand. Try again.\n")
 
+        except QueryTimeoutError as e:
+            print(f"Query timed out: {e} Try a narrower question.\n")
+
         except Exception as e:
             print(f"Error: {e}\n")
 
@@ -0,0 +1,338 @@
+import argparse
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import db_queries
+from db_queries import (
+    get_nav_on_date,
+    get_portfolio_breakdown,
+    get_nav_daily_table,
+    get_holding_on_date,
+    get_cash_on_date,
+    explain_cash_change,
+    get_implied_trades,
+    get_available_dates,
+    get_generation,
+    get_query_metrics,
+    QueryTimeoutError,
+)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = 8
+DEFAULT_CACHE_SIZE = 1024
+
+
+class BadRequest(ValueError):
+    pass
+
+
+# -----------------------------
+# Response cache
+# -----------------------------
+class ResponseCache:
+    """
+    LRU cache of encoded responses for a single load generation.
+    Everything is dropped as soon as a newer generation is seen.
+    """
+
+    def __init__(self, max_entries=DEFAULT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.generation = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, generation):
+        with self._lock:
+            if generation != self.generation:
+                return None
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, generation, entry):
+        with self._lock:
+            # A slow request that started before a reload must not evict
+            # the newer generation's entries
+            if self.generation is not None and generation < self.generation:
+                return
+            if generation != self.generation:
+                self._entries.clear()
+                self.generation = generation
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+# -----------------------------
+# Route handlers
+# -----------------------------
+def _param(params, name):
+    values = params.get(name)
+    if not values or not values[0].strip():
+        raise BadRequest(f"Missing query parameter: {name}")
+    return values[0].strip()
+
+
+def _records(df):
+    return json.loads(df.to_json(orient="records"))
+
+
+def handle_dates(params):
+    return {"dates": get_available_dates()}
+
+
+def handle_nav(params):
+    date = _param(params, "date")
+    return {"date": date, "nav": get_nav_on_date(date)}
+
+
+def handle_nav_daily(params):
+    start_date = _param(params, "start")
+    end_date = _param(params, "end")
+    return {
+        "start": start_date,
+        "end": end_date,
+        "rows": _records(get_nav_daily_table(start_date, end_date)),
+    }
+
+
+def handle_breakdown(params):
+    date = _param(params, "date")
+    return {"date": date, "rows": _records(get_portfolio_breakdown(date))}
+
+
+def handle_cash(params):
+    date = _param(params, "date")
+    return {"date": date, "cash": get_cash_on_date(date)}
+
+
+def handle_holding(params):
+    ticker = _param(params, "ticker").upper()
+    date = _param(params, "date")
+    return {
+        "ticker": ticker,
+        "date": date,
+        "quantity": get_holding_on_date(ticker, date),
+    }
+
+
+def handle_ask(params):
+    # Imported lazily: the assistant module reads tickers and sets up
+    # the LLM client at import time.
+    from assistant import parse_intent
+
+    question = _param(params, "q")
+    intent_data = parse_intent(question)
+    intent = intent_data["intent"]
+    date = intent_data.get("date")
+
+    if intent == "NAV_QUERY":
+        answer = {"nav": get_nav_on_date(date)}
+    elif intent == "HOLDING_QUERY":
+        answer = {
+            "ticker": intent_data.get("ticker"),
+            "quantity": get_holding_on_date(intent_data.get("ticker"), date),
+        }
+    elif intent == "CASH_QUERY":
+        answer = {"cash": get_cash_on_date(date)}
+    elif intent == "CASH_CHANGE_EXPLAIN":
+        answer = {"explanation": explain_cash_change(date)}
+    elif intent == "TRADES_QUERY":
+        trades = get_implied_trades(
+            date or "", date or "9999-12-31", intent_data.get("ticker")
+        )
+        answer = {"trades": _records(trades)}
+    else:
+        raise BadRequest(f"Intent {intent} is not served over HTTP")
+
+    return {"question": question, "intent": intent_data, "answer": answer}
+
+
+ROUTES = {
+    "/dates": handle_dates,
+    "/nav": handle_nav,
+    "/nav/daily": handle_nav_daily,
+    "/breakdown": handle_breakdown,
+    "/cash": handle_cash,
+    "/holding": handle_holding,
+    "/ask": handle_ask,
+}
+
+
+# -----------------------------
+# HTTP layer
+# -----------------------------
+class QueryRequestHandler(BaseHTTPRequestHandler):
+    server_version = "PortfolioQueryService/1.0"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+
+        if url.path == "/metrics":
+            # Live counters, never cached
+            self._send_json(200, get_query_metrics())
+            return
+
+        route = ROUTES.get(url.path)
+
+        if route is None:
+            self._send_json(404, {"error": f"Unknown endpoint {url.path}"})
+            return
+
+        params = parse_qs(url.query)
+        key = (url.path, tuple(sorted((k, tuple(v)) for k, v in params.items())))
+
+        try:
+            generation = get_generation()
+            entry = self.server.cache.get(key, generation)
+
+            if entry is None:
+                body = json.dumps(route(params)).encode("utf-8")
+                digest = hashlib.sha1(body).hexdigest()[:16]
+                entry = (f'"g{generation}-{digest}"', body)
+                self.server.cache.put(key, generation, entry)
+        except BadRequest as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        except QueryTimeoutError as e:
+            self._send_json(504, {"error": str(e)})
+            return
+        except ValueError as e:
+            self._send_json(404, {"error": str(e)})
+            return
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+            return
+
+        etag, body = entry
+
+        if _etag_matches(etag, self.headers.get("If-None-Match")):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+def _etag_matches(etag, if_none_match):
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == "*" or tag == etag:
+            return True
+    return False
+
+
+class PooledHTTPServer(HTTPServer):
+    """
+    HTTPServer that hands each accepted request to a fixed worker pool,
+    sharing a pooled set of database connections and one response cache.
+    """
+
+    request_queue_size = 128
+
+    def __init__(self, address, handler_class, workers=DEFAULT_WORKERS,
+                 cache_size=DEFAULT_CACHE_SIZE, quiet=False):
+        super().__init__(address, handler_class)
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.cache = ResponseCache(cache_size)
+        self.quiet = quiet
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self._process_request, request, client_address)
+
+    def _process_request(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=True)
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=DEFAULT_WORKERS,
+          cache_size=DEFAULT_CACHE_SIZE, quiet=False, memory_replica=False):
+    db_queries.set_entry_point("service")
+    if memory_replica:
+        db_queries.enable_memory_replica()
+    else:
+        db_queries.enable_connection_pool(workers)
+    server = PooledHTTPServer(
+        (host, port),
+        QueryRequestHandler,
+        workers=workers,
+        cache_size=cache_size,
+        quiet=quiet,
+    )
+
+    print(f"Portfolio query service listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        db_queries.disable_connection_pool()
+        db_queries.disable_memory_replica()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local HTTP/JSON portfolio query service.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE)
+    parser.add_argument("--quiet", action="store_true", help="Disable per-request logging")
+    parser.add_argument(
+        "--memory-replica",
+        action="store_true",
+        help="Serve reads from an in-memory copy of the database",
+    )
+    args = parser.parse_args()
+
+    serve(
+        args.host,
+        args.port,
+        args.workers,
+        args.cache_size,
+        args.quiet,
+        args.memory_replica,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from db_queries import get_cash_exposure, get_security_exposures
+from fx_rates import BASE_CURRENCY
+
+SHOCK_LEVELS = ("security", "asset_class", "currency")
+SCENARIO_COLUMNS = ["scenario", "level", "key", "shock"]
+
+# Scenarios are evaluated in blocks so the shock matrix stays bounded
+# (block x securities) however many scenarios are supplied.
+SCENARIO_BLOCK_SIZE = 1024
+
+
+# -----------------------------
+# Scenario definitions
+# -----------------------------
+def load_scenarios(source):
+    """
+    Reads a scenario CSV (path or file-like) with columns
+    scenario, level, key, shock. level is one of security (key is the
+    ticker), asset_class or currency. shock is a relative price move,
+    e.g. -0.10 for a 10% fall. Currency shocks move that currency
+    against the base currency and also apply to cash held in it.
+    """
+    return validate_scenarios(pd.read_csv(source))
+
+
+def validate_scenarios(scenarios_df):
+    missing = [c for c in SCENARIO_COLUMNS if c not in scenarios_df.columns]
+    if missing:
+        raise ValueError(f"Scenario file is missing columns: {', '.join(missing)}")
+
+    df = scenarios_df[SCENARIO_COLUMNS].dropna(how="all").copy()
+
+    # Partly filled rows would otherwise turn into "nan" keys or NaN shocks
+    blank = df.isna() | df.apply(lambda c: c.astype(str).str.strip() == "")
+    incomplete = df[blank.any(axis=1)]
+    if not incomplete.empty:
+        raise ValueError(
+            "Scenario rows with missing values:\n" + incomplete.to_string(index=False)
+        )
+
+    df["scenario"] = df["scenario"].astype(str).str.strip()
+    df["level"] = df["level"].astype(str).str.strip().str.lower()
+    df["key"] = df["key"].astype(str).str.strip()
+    df["shock"] = pd.to_numeric(df["shock"], errors="raise")
+
+    bad_levels = sorted(set(df["level"]) - set(SHOCK_LEVELS))
+    if bad_levels:
+        raise ValueError(
+            f"Unknown shock level(s): {', '.join(bad_levels)}. "
+            f"Use one of: {', '.join(SHOCK_LEVELS)}"
+        )
+
+    base_shocks = df[(df["level"] == "currency") & (df["key"].str.upper() == BASE_CURRENCY)]
+    if not base_shocks.empty:
+        raise ValueError(
+            f"{BASE_CURRENCY} is the base currency and cannot be shocked; "
+            "shock the other currencies against it instead."
+        )
+
+    if (df["shock"] <= -1).any():
+        raise ValueError("Shocks must be greater than -1 (a price cannot fall below zero).")
+
+    duplicates = df[df.duplicated(["scenario", "level", "key"], keep=False)]
+    if not duplicates.empty:
+        raise ValueError(
+            "Duplicate shocks found:\n" + duplicates.to_string(index=False)
+        )
+
+    return df
+
+
+# -----------------------------
+# Shock matrix
+# -----------------------------
+def _key_index(values, keys):
+    """Maps each security's attribute to its column in keys, or to the
+    trailing zero column when the scenario set never shocks it."""
+    positions = pd.Index(keys).get_indexer(values)
+    positions[positions < 0] = len(keys)
+    return positions
+
+
+def build_shock_block(block_rows, n_scenarios, positions_df):
+    """
+    Dense (n_scenarios x securities) matrix of total price shocks.
+    Shocks at different levels add up: a USD equity in a scenario that
+    moves equities -10% and USD -2% gets -12%.
+    """
+    n_securities = len(positions_df)
+    shocks = np.zeros((n_scenarios, n_securities))
+
+    for level, attribute in (("asset_class", "asset_class"), ("currency", "currency")):
+        rows = block_rows[block_rows["level"] == level]
+        if rows.empty:
+            continue
+        keys, key_codes = np.unique(rows["key"].to_numpy(), return_inverse=True)
+        by_key = np.zeros((n_scenarios, len(keys) + 1))
+        by_key[rows["row"].to_numpy(), key_codes] = rows["shock"].to_numpy()
+        shocks += by_key[:, _key_index(positions_df[attribute].to_numpy(), keys)]
+
+    rows = block_rows[block_rows["level"] == "security"]
+    if not rows.empty:
+        columns = pd.Index(positions_df["ticker"]).get_indexer(rows["key"])
+        held = columns >= 0
+        np.add.at(
+            shocks,
+            (rows["row"].to_numpy()[held], columns[held]),
+            rows["shock"].to_numpy()[held],
+        )
+
+    return shocks
+
+
+def run_scenarios(positions_df, scenarios_df, nav, block_size=SCENARIO_BLOCK_SIZE):
+    """
+    NAV impact of every scenario on a set of positions, computed as a
+    shock matrix times the market value vector. positions_df needs
+    ticker, asset_class, currency and market_value columns.
+    """
+    scenarios_df = validate_scenarios(scenarios_df)
+    codes, names = pd.factorize(scenarios_df["scenario"], sort=False)
+    scenarios_df = scenarios_df.assign(code=codes).sort_values("code")
+
+    market_values = positions_df["market_value"].to_numpy(dtype=float)
+    sorted_codes = scenarios_df["code"].to_numpy()
+    impact = np.empty(len(names))
+
+    for start in range(0, len(names), block_size):
+        stop = min(start + block_size, len(names))
+        lo, hi = np.searchsorted(sorted_codes, [start, stop])
+        block_rows = scenarios_df.iloc[lo:hi].assign(
+            row=lambda df: df["code"] - start
+        )
+        shocks = build_shock_block(block_rows, stop - start, positions_df)
+        impact[start:stop] = shocks @ market_values
+
+    results = pd.DataFrame({
+        "scenario": names,
+        "nav_impact": impact,
+        "nav_after": nav + impact,
+        "nav_return": impact / nav,
+    })
+    return results.sort_values("nav_impact").reset_index(drop=True)
+
+
+def run_scenarios_on_date(date, scenarios_df, block_size=SCENARIO_BLOCK_SIZE):
+    positions_df = get_security_exposures(date)
+    cash_df = get_cash_exposure(date)
+    nav = positions_df["market_value"].sum() + cash_df["market_value"].sum()
+
+    # Cash has no ticker or asset class to match, so it only moves with
+    # shocks to its currency
+    exposures = pd.concat(
+        [positions_df, cash_df.assign(ticker=None, asset_class=None)],
+        ignore_index=True,
+    )
+    return run_scenarios(exposures, scenarios_df, nav, block_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run price shock scenarios against a portfolio date.")
+    parser.add_argument("scenarios", help="Scenario CSV: scenario, level, key, shock")
+    parser.add_argument("--date", required=True, help="Portfolio date (YYYY-MM-DD)")
+    parser.add_argument("--output", help="Write results to this CSV instead of printing")
+    args = parser.parse_args()
+
+    results = run_scenarios_on_date(args.date, load_scenarios(args.scenarios))
+
+    if args.output:
+        results.to_csv(args.output, index=False)
+        print(f"Wrote {len(results):,} scenario results to {args.output}")
+    else:
+        print(results.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
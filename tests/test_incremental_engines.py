@@ -0,0 +1,117 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from holding_intervals import derive_holding_dates, derive_holding_intervals
+from metrics_engine import update_risk_metrics
+from trade_engine import update_implied_trades
+
+DATES = pd.bdate_range("2025-01-01", periods=30).strftime("%Y-%m-%d")
+
+
+def make_inputs():
+    rows = [(d, sid) for d in DATES for sid in (1, 2)]
+    prices = pd.DataFrame(rows, columns=["price_date", "security_id"])
+    prices["close_price"] = [100 + i % 7 + sid for i, (_, sid) in enumerate(rows)]
+    prices["close_price_base"] = prices["close_price"]
+
+    holdings = pd.DataFrame(rows, columns=["holding_date", "security_id"])
+    holdings["quantity"] = [10 + (i // 10) * sid for i, (_, sid) in enumerate(rows)]
+
+    cash = pd.DataFrame({
+        "cash_date": DATES,
+        "currency": "USD",
+        "amount": [1000.0 + 25 * i for i in range(len(DATES))],
+        "fx_rate": 1.0,
+    })
+    cash["amount_base"] = cash["amount"]
+    return prices, holdings, cash
+
+
+def load(conn, prices, holdings, cash):
+    """Replaces the base tables the way the loader does, keeping derived ones."""
+    for name, df in (
+        ("prices", prices),
+        ("holdings", holdings),
+        ("holding_intervals", derive_holding_intervals(holdings)),
+        ("holding_dates", derive_holding_dates(holdings)),
+        ("cash", cash),
+    ):
+        df.to_sql(name, conn, if_exists="replace", index=False)
+    update_risk_metrics(conn)
+    update_implied_trades(conn)
+
+
+def derived_tables(conn):
+    return (
+        pd.read_sql("SELECT * FROM risk_metrics ORDER BY metric_date", conn),
+        pd.read_sql(
+            "SELECT * FROM implied_trades ORDER BY trade_date, security_id", conn
+        ),
+    )
+
+
+def restate(prices, holdings, cash, table):
+    day = DATES[5]
+    if table == "prices":
+        prices.loc[prices["price_date"] == day, ["close_price", "close_price_base"]] += 3
+    elif table == "holdings":
+        holdings.loc[
+            (holdings["holding_date"] == day) & (holdings["security_id"] == 1), "quantity"
+        ] += 5
+    else:
+        cash.loc[cash["cash_date"] == day, ["amount", "amount_base"]] += 50
+
+
+@pytest.mark.parametrize("table", ["prices", "holdings", "cash"])
+def test_restated_history_matches_full_rebuild(table):
+    prices, holdings, cash = make_inputs()
+
+    incremental = sqlite3.connect(":memory:")
+    load(
+        incremental,
+        prices[prices["price_date"] <= DATES[19]],
+        holdings[holdings["holding_date"] <= DATES[19]],
+        cash[cash["cash_date"] <= DATES[19]],
+    )
+
+    restate(prices, holdings, cash, table)
+    load(incremental, prices, holdings, cash)
+
+    full = sqlite3.connect(":memory:")
+    load(full, prices, holdings, cash)
+
+    for got, expected in zip(derived_tables(incremental), derived_tables(full)):
+        pd.testing.assert_frame_equal(got, expected)
+
+
+def test_appended_days_match_full_rebuild():
+    prices, holdings, cash = make_inputs()
+
+    incremental = sqlite3.connect(":memory:")
+    for last in (DATES[9], DATES[19], DATES[-1]):
+        load(
+            incremental,
+            prices[prices["price_date"] <= last],
+            holdings[holdings["holding_date"] <= last],
+            cash[cash["cash_date"] <= last],
+        )
+
+    full = sqlite3.connect(":memory:")
+    load(full, prices, holdings, cash)
+
+    for got, expected in zip(derived_tables(incremental), derived_tables(full)):
+        pd.testing.assert_frame_equal(got, expected)
+
+
+def test_restatement_recomputes_from_changed_date():
+    prices, holdings, cash = make_inputs()
+
+    conn = sqlite3.connect(":memory:")
+    load(conn, prices, holdings, cash)
+    assert update_risk_metrics(conn) == 0
+
+    restate(prices, holdings, cash, "prices")
+    prices.to_sql("prices", conn, if_exists="replace", index=False)
+    assert update_risk_metrics(conn) == len(DATES) - 5
@@ -0,0 +1,143 @@
+import pandas as pd
+
+from db_queries import insert_frame
+from metrics_engine import (
+    END_OF_TIME,
+    INPUT_DIGESTS_TABLE,
+    first_changed_date,
+    input_digests,
+    save_input_digests,
+)
+
+IMPLIED_TRADES_TABLE = """
+CREATE TABLE IF NOT EXISTS implied_trades (
+    trade_date TEXT NOT NULL,
+    security_id INTEGER NOT NULL,
+    quantity_before INTEGER NOT NULL,
+    quantity_after INTEGER NOT NULL,
+    quantity_delta INTEGER NOT NULL,
+    close_price REAL,
+    notional REAL,
+    PRIMARY KEY (trade_date, security_id)
+)
+"""
+
+IMPLIED_TRADES_SECURITY_INDEX = """
+CREATE INDEX IF NOT EXISTS idx_implied_trades_security
+    ON implied_trades (security_id, trade_date)
+"""
+
+TRADE_COLUMNS = [
+    "trade_date",
+    "security_id",
+    "quantity_before",
+    "quantity_after",
+    "quantity_delta",
+    "close_price",
+    "notional",
+]
+
+
+def derive_implied_trades(holdings_df, prices_df):
+    """
+    Diffs consecutive holding dates in one vectorised pass. A security
+    missing on a date is treated as a zero position, so exits show up as
+    sells. The first date is the opening position and produces no trades.
+    Notional is the quantity delta at that day's close price, both in the
+    base currency.
+    """
+    quantities = holdings_df.pivot(
+        index="holding_date", columns="security_id", values="quantity"
+    ).sort_index().fillna(0)
+
+    before = quantities.shift(1).iloc[1:]
+    after = quantities.iloc[1:]
+    delta = after - before
+
+    trades = pd.DataFrame({
+        "quantity_before": before.stack(),
+        "quantity_after": after.stack(),
+        "quantity_delta": delta.stack(),
+    })
+    trades = trades[trades["quantity_delta"] != 0].reset_index()
+    trades = trades.rename(columns={"holding_date": "trade_date"})
+    trades[["quantity_before", "quantity_after", "quantity_delta"]] = trades[
+        ["quantity_before", "quantity_after", "quantity_delta"]
+    ].astype("int64")
+
+    trades = trades.merge(
+        prices_df.rename(columns={"price_date": "trade_date"}),
+        on=["trade_date", "security_id"],
+        how="left",
+    )
+    trades["notional"] = trades["quantity_delta"] * trades["close_price"]
+
+    return trades[TRADE_COLUMNS]
+
+
+def _read_inputs(conn, start_date):
+    holdings_df = pd.read_sql(
+        """
+        SELECT holding_date, security_id, quantity
+        FROM holdings
+        WHERE holding_date >= ?
+        """,
+        conn,
+        params=(start_date,),
+    )
+    prices_df = pd.read_sql(
+        """
+        SELECT price_date, security_id, close_price_base AS close_price
+        FROM prices
+        WHERE price_date > ?
+        """,
+        conn,
+        params=(start_date,),
+    )
+    return holdings_df, prices_df
+
+
+def update_implied_trades(conn):
+    """
+    Extends implied_trades with dates after the last processed one,
+    diffing only from that date forward. If earlier holdings or prices
+    were restated, rediffs from the last holding date before the first
+    change. Returns the number of trades written.
+    """
+    conn.execute(IMPLIED_TRADES_TABLE)
+    conn.execute(IMPLIED_TRADES_SECURITY_INDEX)
+    conn.execute(INPUT_DIGESTS_TABLE)
+
+    digests = input_digests(conn, tables=("holdings", "prices"))
+    changed_date = first_changed_date(conn, "implied_trades", digests) or END_OF_TIME
+
+    # Last processed holding date before the change, the opening position
+    # for the rediff. Empty when everything has to be rebuilt.
+    last_date = conn.execute(
+        """
+        SELECT COALESCE(MAX(holding_date), '')
+        FROM holdings
+        WHERE holding_date < ?
+          AND holding_date <= (
+              SELECT MAX(input_date)
+              FROM derived_inputs
+              WHERE name = 'implied_trades'
+          )
+        """,
+        (changed_date,),
+    ).fetchone()[0]
+
+    conn.execute("DELETE FROM implied_trades WHERE trade_date > ?", (last_date,))
+    holdings_df, prices_df = _read_inputs(conn, last_date)
+
+    if holdings_df.empty:
+        save_input_digests(conn, "implied_trades", digests, last_date, last_date)
+        return 0
+
+    trades = derive_implied_trades(holdings_df, prices_df)
+    insert_frame(conn, "implied_trades", trades)
+
+    through = holdings_df["holding_date"].max()
+    save_input_digests(conn, "implied_trades", digests, last_date, through)
+
+    return len(trades)